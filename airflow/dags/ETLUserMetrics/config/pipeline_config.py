@@ -4,6 +4,8 @@ from pathlib import Path
 # Paths (injected via .env or fallback defaults)
 RAW_PATH = os.getenv("RAW_PATH", "/app/data_lake/raw")
 DUCKDB_PATH = os.getenv("DUCKDB_PATH", "/app/db/my_duck.db")
+RESULTS_PATH = os.getenv("RESULTS_PATH", "/app/data_lake/results")
+PROFILES_PATH = os.getenv("PROFILES_PATH", "/app/db/profiles")
 
 # API Configuration
 API_BASE_URL = os.getenv("API_BASE_URL", "https://fakerapi.it/api/v2/persons")
@@ -26,9 +28,32 @@ INTERNAL_SQL_DIR = BASE_SQL_DIR / "internal"
 REPORTING_SQL_DIR = BASE_SQL_DIR / "reporting"
 DEFAULT_SQL_DIR = REPORTING_SQL_DIR
 
+# Pipeline mode: "split" (fetch_and_anonymize -> transform via Parquet) or
+# "fused" (single task, transform in memory, Parquet written only for lineage)
+PIPELINE_MODE = os.getenv("PIPELINE_MODE", "split")
+
 # Metadata logging
 METADATA_TABLE_NAME = "metadata_log"
-METADATA_UNIQUE_COLUMNS = ["country", "city", "age_group", "email_provider", "email"]
+METADATA_UNIQUE_COLUMNS = ["country", "city", "age_group", "email"]
+
+# Distinct counting: "approx" (mergeable HyperLogLog sketches per ingestion_date) or "exact" (audits)
+DISTINCT_COUNT_MODE = os.getenv("DISTINCT_COUNT_MODE", "approx")
+HLL_ERROR_BOUND = float(os.getenv("HLL_ERROR_BOUND", "0.01"))  # relative standard error
+HLL_SKETCHES_TABLE_NAME = "hll_sketches"
+HLL_SKETCHES_SQL_FILENAME = "hll_sketches.sql"
+HLL_COLUMN_SETS = {
+    "metadata_unique": METADATA_UNIQUE_COLUMNS,
+    "email_provider": ["email"],
+}
+
+# Stage caching: skip a stage when its input fingerprint matches the last successful run
+STAGE_CACHE_ENABLED = os.getenv("STAGE_CACHE_ENABLED", "true").lower() == "true"
+STAGE_FINGERPRINTS_TABLE_NAME = "stage_fingerprints"
+STAGE_FINGERPRINTS_SQL_FILENAME = "stage_fingerprints.sql"
+
+# Process-pool execution of per-row Python logic (anonymize/transform)
+PARALLEL_WORKERS = int(os.getenv("PARALLEL_WORKERS", "0"))  # 0 = one worker per usable core
+PARALLEL_MIN_ROWS = int(os.getenv("PARALLEL_MIN_ROWS", "50000"))  # smaller inputs run in-process
 
 # Storage settings
 PARQUET_FILENAME = "persons.parquet"
@@ -43,3 +68,14 @@ FINAL_USER_COLUMNS = [
 
 # Validation / Reporting
 UNIQUE_SQL_FILENAME = "unique_email_provider_count.sql"
+PARTITION_COUNT_SQL_FILENAME = "create_tables.sql"
+
+# Query profiling (opt-in, records every pipeline statement into QUERY_PROFILES_TABLE_NAME)
+QUERY_PROFILING_ENABLED = os.getenv("QUERY_PROFILING_ENABLED", "false").lower() == "true"
+QUERY_PROFILES_TABLE_NAME = "query_profiles"
+QUERY_PROFILES_SQL_FILENAME = "query_profiles.sql"
+
+# Per-task DuckDB resource settings (used by DuckDBExecuteQueryOperator)
+DUCKDB_TASK_THREADS = int(os.getenv("DUCKDB_TASK_THREADS", "2"))
+DUCKDB_TASK_MEMORY_LIMIT = os.getenv("DUCKDB_TASK_MEMORY_LIMIT", "1GB")
+DUCKDB_TEMP_DIRECTORY = os.getenv("DUCKDB_TEMP_DIRECTORY", "/tmp/duckdb_spill")
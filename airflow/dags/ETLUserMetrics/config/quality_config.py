@@ -0,0 +1,36 @@
+import os
+
+from ETLUserMetrics.config.pipeline_config import METADATA_UNIQUE_COLUMNS
+
+# Declarative data-quality checks, compiled into one DuckDB aggregate query over the
+# newly loaded partition (see pr_utils/quality.py). Checks with severity "error" block the load.
+#
+# Check types:
+#   null_rate       -> share of NULLs in `column` must be <= `max_rate`
+#   allowed_values  -> share of values outside `values` must be <= `max_rate`
+#   pattern         -> share of values not matching the regex `pattern` must be <= `max_rate`
+#   row_count       -> partition must hold at least `min_rows` rows
+#   row_count_delta -> relative change vs. the previous ingestion_date must be <= `max_change`;
+#                      the baseline is that date's recorded metric of `baseline_check` (default "row_count")
+#                      in data_quality_results, as persons_anonymized is rebuilt every DAG run
+#   uniqueness      -> distinct ratio over `columns` must be >= `min_ratio`
+
+AGE_GROUPS = [f"[{lower}-{lower + 10}]" for lower in range(0, 90, 10)] + ["[90+]", "unknown"]
+
+QUALITY_CHECKS = [
+    {"type": "row_count", "min_rows": 1, "severity": "error"},
+    {"type": "row_count_delta", "max_change": 0.5, "severity": "error"},
+    {"type": "null_rate", "column": "email", "max_rate": 0.0, "severity": "error"},
+    {"type": "null_rate", "column": "country", "max_rate": 0.01, "severity": "error"},
+    {"type": "null_rate", "column": "city", "max_rate": 0.01, "severity": "warn"},
+    {"type": "allowed_values", "column": "gender", "values": ["male", "female"], "max_rate": 0.0, "severity": "error"},
+    {"type": "allowed_values", "column": "age_group", "values": AGE_GROUPS, "max_rate": 0.0, "severity": "error"},
+    {"type": "pattern", "column": "email", "pattern": r"^([a-z0-9-]+\.)+[a-z]{2,}$|^unknown$", "max_rate": 0.01, "severity": "error"},
+    {"type": "uniqueness", "columns": METADATA_UNIQUE_COLUMNS, "min_ratio": 0.9, "severity": "warn"},
+]
+
+DATA_QUALITY_ENABLED = os.getenv("DATA_QUALITY_ENABLED", "true").lower() == "true"
+# Percentage of the partition sampled for rate checks (row counts and uniqueness always use all rows)
+DATA_QUALITY_SAMPLE_PERCENT = float(os.getenv("DATA_QUALITY_SAMPLE_PERCENT", "100"))
+DATA_QUALITY_TABLE_NAME = "data_quality_results"
+DATA_QUALITY_SQL_FILENAME = "data_quality_results.sql"
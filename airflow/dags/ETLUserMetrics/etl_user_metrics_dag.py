@@ -5,12 +5,19 @@ from airflow.utils.dates import days_ago
 from pathlib import Path
 from datetime import timedelta
 
-from ETLUserMetrics.pr_utils.fetch import fetch_all_users_parallel
-from ETLUserMetrics.pr_utils.anonymize import anonymize_users
-from ETLUserMetrics.pr_utils.storage import save_parquet, log_metadata, cleanup_metadata_log
-from ETLUserMetrics.pr_utils.transformation import run_transformation_pipeline
-from ETLUserMetrics.pr_utils.utils import run_sql_query
-from ETLUserMetrics.config.pipeline_config import RAW_PATH
+# Only airflow and the stdlib-only config are imported at parse time. Pipeline modules
+# (pandas, duckdb, requests) are imported inside the task callables, at execute time.
+from ETLUserMetrics.config.pipeline_config import (
+    RAW_PATH,
+    PIPELINE_MODE,
+    RESULTS_PATH,
+    PROFILES_PATH,
+    INTERNAL_SQL_DIR,
+    PARTITION_COUNT_SQL_FILENAME,
+    DUCKDB_TASK_THREADS,
+    DUCKDB_TASK_MEMORY_LIMIT,
+    DUCKDB_TEMP_DIRECTORY,
+)
 
 from ETLUserMetrics.pr_utils.operators.duckdb_operator import DuckDBExecuteQueryOperator
 from airflow.utils.task_group import TaskGroup
@@ -30,22 +37,58 @@ REPORTING_SQL_FILES = [
 # -------- TASKS -------- #
 
 def fetch_and_anonymize(execution_date):
+    from ETLUserMetrics.pr_utils.fetch import fetch_all_users_parallel
+    from ETLUserMetrics.pr_utils.anonymize import anonymize_users
+    from ETLUserMetrics.pr_utils.storage import save_parquet, log_metadata
+
     users = fetch_all_users_parallel()
     df = anonymize_users(users)
     parquet_path = save_parquet(df, RAW_PATH, execution_date)
     log_metadata(df, parquet_path)
 
 
-def transform(execution_date):
-    run_transformation_pipeline(execution_date)
+def is_forced(force) -> bool:
+    # Templated op_kwargs arrive as strings ("True"/"False")
+    return str(force).lower() == "true"
+
+
+def transform(execution_date, force=False):
+    from ETLUserMetrics.pr_utils.transformation import run_transformation_pipeline
+
+    run_transformation_pipeline(execution_date, force=is_forced(force))
+
+
+def fetch_anonymize_transform(execution_date, force=False):
+    from ETLUserMetrics.pr_utils.fetch import fetch_all_users_parallel
+    from ETLUserMetrics.pr_utils.anonymize import anonymize_users
+    from ETLUserMetrics.pr_utils.transformation import run_fused_pipeline
+
+    users = fetch_all_users_parallel()
+    df = anonymize_users(users)
+    run_fused_pipeline(df, execution_date, force=is_forced(force))
+
+
+def cleanup_metadata():
+    from ETLUserMetrics.pr_utils.storage import cleanup_metadata_log
+
+    cleanup_metadata_log()
+
+
+def run_reporting_query(sql_filename: str, sql_dir: Path):
+    from ETLUserMetrics.pr_utils.utils import run_sql_query
+
+    return run_sql_query(sql_filename, sql_dir)
 
 def create_reporting_task(task_id: str):
     return PythonOperator(
         task_id=task_id,
-        python_callable=run_sql_query,
+        python_callable=run_reporting_query,
         op_args=[task_id, SQL_REPORTING_DIR],  # Correct usage
     )
 
+# Trigger with conf {"force": true} to bypass stage caching
+FORCE_TEMPLATE = "{{ dag_run.conf.get('force', False) if dag_run and dag_run.conf else False }}"
+
 # -------- DAG SETUP -------- #
 
 default_args = {
@@ -67,15 +110,9 @@ with DAG(
     start = EmptyOperator(task_id="start")
     end = EmptyOperator(task_id="end")
 
-    fetch_task = PythonOperator(
-        task_id="fetch_and_anonymize",
-        python_callable=fetch_and_anonymize,
-        op_kwargs={"execution_date": "{{ ds }}"}
-    )
-
     cleanup_task = PythonOperator(
         task_id="cleanup_metadata_log",
-        python_callable=cleanup_metadata_log
+        python_callable=cleanup_metadata
     )
 
     init_internal_tables = DuckDBExecuteQueryOperator(
@@ -84,10 +121,38 @@ with DAG(
     dag=dag
     )
 
-    transform_task = PythonOperator(
-        task_id="transform",
-        python_callable=transform,
-        op_kwargs={"execution_date": "{{ ds }}"}
+    if PIPELINE_MODE == "fused":
+        # Single task: anonymized data is transformed in memory, Parquet is written for lineage only
+        fetch_task = transform_task = PythonOperator(
+            task_id="fetch_anonymize_transform",
+            python_callable=fetch_anonymize_transform,
+            op_kwargs={"execution_date": "{{ ds }}", "force": FORCE_TEMPLATE}
+        )
+    else:
+        fetch_task = PythonOperator(
+            task_id="fetch_and_anonymize",
+            python_callable=fetch_and_anonymize,
+            op_kwargs={"execution_date": "{{ ds }}"}
+        )
+
+        transform_task = PythonOperator(
+            task_id="transform",
+            python_callable=transform,
+            op_kwargs={"execution_date": "{{ ds }}", "force": FORCE_TEMPLATE}
+        )
+
+        fetch_task >> transform_task
+
+    partition_row_count = DuckDBExecuteQueryOperator(
+        task_id="partition_row_count",
+        sql_path=str(INTERNAL_SQL_DIR / PARTITION_COUNT_SQL_FILENAME),
+        parameters={"ingestion_date": "{{ ds }}"},
+        threads=DUCKDB_TASK_THREADS,
+        memory_limit=DUCKDB_TASK_MEMORY_LIMIT,
+        temp_directory=DUCKDB_TEMP_DIRECTORY,
+        profiling="json",
+        profile_dir=PROFILES_PATH + "/{{ ds }}",
+        output_path=RESULTS_PATH + "/{{ ds }}/partition_row_count.parquet",
     )
 
     # # Reporting
@@ -102,5 +167,7 @@ with DAG(
         ]
 
     # Flow
-    start >> init_internal_tables >> fetch_task >> transform_task >> reporting_group >> cleanup_task >>end
+    start >> init_internal_tables >> fetch_task
+    transform_task >> reporting_group >> cleanup_task >>end
+    transform_task >> partition_row_count >> cleanup_task
 
@@ -3,6 +3,8 @@ from datetime import datetime
 
 from ETLUserMetrics.config.anonymization_config import ANONYMIZATION_CONFIG, NESTED_FIELDS
 from ETLUserMetrics.pr_utils.utils import get_logger
+from ETLUserMetrics.pr_utils.memory import compact_dataframe, log_memory_footprint
+from ETLUserMetrics.pr_utils.parallel import map_records
 
 # Initialize logger for the current module
 logger = get_logger(__name__)
@@ -29,23 +31,25 @@ def get_value_from_user_record(user: dict, field: str):
     return None
 
 
-def anonymize_users(users: list[dict], config: dict = ANONYMIZATION_CONFIG) -> pd.DataFrame:
+def anonymize_records(users: list[dict], config: dict = ANONYMIZATION_CONFIG, start_index: int = 0) -> pd.DataFrame:
     """
-    Anonymizes a list of user dictionaries based on a given configuration.
+    Anonymizes a contiguous slice of user records into an (uncompacted) DataFrame.
 
     - Flattens nested user fields (e.g., address).
     - Applies anonymization functions from config to selected fields.
-    - Logs progress and errors encountered during anonymization.
+    - Logs errors encountered during anonymization.
 
     Args:
-        users (list[dict]): List of user records from the API.
+        users (list[dict]): User records from the API.
         config (dict): A dictionary of field-to-function mappings for anonymization.
+        start_index (int): Position of the first record in the full input, used in log messages.
 
     Returns:
-        pd.DataFrame: A DataFrame containing the anonymized user data.
+        pd.DataFrame: One row per record, with a RangeIndex.
     """
-    logger.info(f"Starting anonymization for {len(users)} user records...")
-    anonymized = []
+    # Built column-wise: one list per field instead of one dict per row.
+    # Constant masks ("****") are then just repeated references to the same string.
+    columns = {}
 
     for idx, user in enumerate(users):
         row = {}
@@ -63,13 +67,45 @@ def anonymize_users(users: list[dict], config: dict = ANONYMIZATION_CONFIG) -> p
                 try:
                     row[field] = config[field](value)  # Apply anonymization
                 except Exception as e:
-                    logger.error(f"Error anonymizing field '{field}' in user index {idx}: {e}")
+                    logger.error(f"Error anonymizing field '{field}' in user index {start_index + idx}: {e}")
                     row[field] = None
             else:
                 # Keep the original value if no anonymization is defined
                 row[field] = value
 
-        anonymized.append(row)
+        for field, value in row.items():
+            column = columns.setdefault(field, [])
+            # Pad fields that were missing from earlier records
+            column.extend([None] * (idx - len(column)))
+            column.append(value)
+
+    for column in columns.values():
+        column.extend([None] * (len(users) - len(column)))
+
+    return pd.DataFrame(columns, index=pd.RangeIndex(len(users)))
+
+
+def anonymize_users(users: list[dict], config: dict = ANONYMIZATION_CONFIG, workers: int = None) -> pd.DataFrame:
+    """
+    Anonymizes a list of user dictionaries based on a given configuration.
+
+    - Large inputs are split into chunks and anonymized across a process pool
+      (see pr_utils.parallel), so custom rules are not limited to a single core.
+    - Returns a compact DataFrame: constant masks and other low-cardinality
+      columns are categoricals, integer ids are downcast.
+
+    Args:
+        users (list[dict]): List of user records from the API.
+        config (dict): A dictionary of field-to-function mappings for anonymization.
+        workers (int, optional): Worker processes. Defaults to PARALLEL_WORKERS / available cores.
+
+    Returns:
+        pd.DataFrame: A DataFrame containing the anonymized user data.
+    """
+    logger.info(f"Starting anonymization for {len(users)} user records...")
+    df = map_records(users, lambda chunk, start: anonymize_records(chunk, config, start), workers)
 
-    logger.info(f"Anonymization complete. Total records processed: {len(anonymized)}")
-    return pd.DataFrame(anonymized)
+    logger.info(f"Anonymization complete. Total records processed: {len(users)}")
+    df = compact_dataframe(df)
+    log_memory_footprint(df, "anonymize")
+    return df
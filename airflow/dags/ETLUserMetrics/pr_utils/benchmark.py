@@ -0,0 +1,363 @@
+"""
+End-to-end scale benchmark for the user metrics pipeline.
+
+Runs fetch -> anonymize -> parquet -> metadata -> transform -> insert -> reporting
+(or the fused in-memory variant with --mode fused) in-process against a synthetic data source, using a temporary RAW_PATH and DUCKDB_PATH.
+Each scale runs in a fresh interpreter so paths and peak memory are isolated.
+
+Usage:
+    python -m ETLUserMetrics.pr_utils.benchmark --persons 30000 1000000 --mode split fused --output report.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+from pathlib import Path
+
+BENCHMARK_EXECUTION_DATE = "2024-01-01"
+
+SYNTHETIC_COUNTRIES = [
+    ("Germany", "DE"), ("France", "FR"), ("Spain", "ES"), ("Italy", "IT"), ("Netherlands", "NL"),
+    ("Poland", "PL"), ("United States", "US"), ("Brazil", "BR"), ("Japan", "JP"), ("India", "IN"),
+]
+SYNTHETIC_DOMAINS = ["gmail.com", "yahoo.com", "hotmail.com", "outlook.com", "web.de", "gmx.net"]
+SYNTHETIC_CITIES_PER_COUNTRY = 50
+MEMORY_SAMPLE_INTERVAL_SECONDS = 0.01
+
+
+def generate_synthetic_users(count: int, seed: int = 42) -> list[dict]:
+    """
+    Generates user records with the same shape as the Faker API persons endpoint.
+
+    Args:
+        count (int): Number of persons to generate.
+        seed (int): Seed for reproducible data.
+
+    Returns:
+        list[dict]: Synthetic user records, including the nested 'address' block.
+    """
+    rng = random.Random(seed)
+    birthday_start = date(1960, 1, 1)
+    birthday_span = (date(2005, 12, 31) - birthday_start).days
+
+    users = []
+    for i in range(1, count + 1):
+        country, country_code = rng.choice(SYNTHETIC_COUNTRIES)
+        users.append({
+            "id": i,
+            "firstname": f"First{i}",
+            "lastname": f"Last{i}",
+            "email": f"user{i}@{rng.choice(SYNTHETIC_DOMAINS)}",
+            "phone": f"+49{rng.randrange(10**9, 10**10)}",
+            "birthday": (birthday_start + timedelta(days=rng.randrange(birthday_span))).isoformat(),
+            "gender": "male" if i % 2 else "female",
+            "address": {
+                "id": i,
+                "street": f"{rng.randrange(1, 999)} Main Street",
+                "streetName": "Main Street",
+                "buildingNumber": str(rng.randrange(1, 999)),
+                "city": f"{country} City {rng.randrange(SYNTHETIC_CITIES_PER_COUNTRY)}",
+                "zipcode": f"{rng.randrange(10000, 99999)}",
+                "country": country,
+                "country_code": country_code,
+                "latitude": rng.uniform(-90, 90),
+                "longitude": rng.uniform(-180, 180),
+            },
+            "website": "http://example.com",
+            "image": "http://placeimg.com/640/480/people",
+        })
+    return users
+
+
+def peak_rss_mb(who: int = resource.RUSAGE_SELF) -> float:
+    """
+    Returns the peak resident set size in MB as reported by getrusage.
+
+    Args:
+        who (int): resource.RUSAGE_SELF for this process, or resource.RUSAGE_CHILDREN for the
+            largest of its terminated and waited-for children (e.g. parallel workers).
+    """
+    peak = resource.getrusage(who).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes on Linux
+    return round(peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024, 1)
+
+
+def current_rss_mb() -> float:
+    """Returns the current resident set size in MB from /proc/self/statm, or None if unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+    except OSError:
+        return None
+    return round(resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024), 1)
+
+
+def _process_memory_bytes(pid) -> int:
+    """
+    Returns the memory of one process in bytes, or None if it is unavailable or has exited.
+
+    Prefers the proportional set size from smaps_rollup, which splits pages shared between a
+    parent and its forked workers so the sum over a process tree does not double count them,
+    and falls back to the resident set size from statm.
+    """
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _child_pids(pid: int) -> list[int]:
+    """Returns the direct children of `pid` from /proc/<pid>/task/*/children."""
+    children = []
+    for path in Path(f"/proc/{pid}/task").glob("*/children"):
+        try:
+            children.extend(int(child) for child in path.read_text().split())
+        except OSError:
+            continue
+    return children
+
+
+def process_tree_memory_mb() -> float:
+    """
+    Returns the memory of this process and all of its descendants in MB, or None without /proc.
+
+    Includes forked workers such as the pr_utils.parallel process pool, which a per-process
+    reading misses entirely.
+    """
+    total = _process_memory_bytes(os.getpid())
+    if total is None:
+        return None
+    pending = _child_pids(os.getpid())
+    while pending:
+        pid = pending.pop()
+        # children may exit between listing and reading, which just drops them from the sample
+        memory = _process_memory_bytes(pid)
+        if memory is not None:
+            total += memory
+        pending.extend(_child_pids(pid))
+    return round(total / (1024 * 1024), 1)
+
+
+class MemorySampler:
+    """
+    Tracks the peak memory of this process tree while a block runs, by polling on a background thread.
+
+    Unlike ru_maxrss, which is a process-wide high-water mark, the peak starts from the
+    current memory on entry, so each stage reports its own peak, and it includes the memory
+    of forked workers alive during the stage. Where /proc is unavailable (e.g. macOS) it
+    falls back to the process-wide peak RSS.
+    """
+
+    def __init__(self, interval: float = MEMORY_SAMPLE_INTERVAL_SECONDS):
+        self.interval = interval
+        self.peak_mb = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._poll, daemon=True)
+
+    def _sample(self):
+        memory = process_tree_memory_mb()
+        if memory is not None:
+            self.peak_mb = memory if self.peak_mb is None else max(self.peak_mb, memory)
+
+    def _poll(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def __enter__(self):
+        self._sample()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+        if self.peak_mb is None:
+            self.peak_mb = peak_rss_mb()
+
+
+def directory_size_mb(path: Path) -> float:
+    """Returns the total size of all files under `path` in MB."""
+    return round(sum(f.stat().st_size for f in Path(path).rglob("*") if f.is_file()) / (1024 * 1024), 2)
+
+
+class StageTimer:
+    """Collects wall time, throughput and per-stage peak memory for consecutive pipeline stages."""
+
+    def __init__(self):
+        self.stages = []
+
+    def run(self, name: str, rows: int, func, *args, **kwargs):
+        with MemorySampler() as memory:
+            start = time.perf_counter()
+            result = func(*args, **kwargs)
+            seconds = time.perf_counter() - start
+        self.stages.append({
+            "stage": name,
+            "seconds": round(seconds, 4),
+            "rows": rows,
+            "rows_per_second": round(rows / seconds) if rows and seconds > 0 else None,
+            "peak_memory_mb": memory.peak_mb,
+        })
+        return result
+
+
+def run_single_scale(persons: int, work_dir: str, seed: int = 42, mode: str = "split") -> dict:
+    """
+    Runs the whole pipeline for one scale and returns its report.
+
+    RAW_PATH and DUCKDB_PATH are pointed at `work_dir` before the pipeline modules
+    are imported, so this must run in a fresh interpreter (see `run_benchmark`).
+
+    Args:
+        persons (int): Number of synthetic persons to process.
+        work_dir (str): Directory for the temporary data lake and DuckDB file.
+        seed (int): Seed for the synthetic data source.
+        mode (str): "split" (Parquet round trip, as the two-task layout) or "fused".
+
+    Returns:
+        dict: Per-stage metrics, on-disk sizes and reporting query latencies.
+    """
+    raw_path = Path(work_dir) / "raw"
+    db_path = Path(work_dir) / "db" / "benchmark.duckdb"
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    os.environ["RAW_PATH"] = str(raw_path)
+    os.environ["DUCKDB_PATH"] = str(db_path)
+
+    import duckdb
+    import pandas as pd
+    from ETLUserMetrics.config.pipeline_config import REPORTING_SQL_DIR
+    from ETLUserMetrics.pr_utils.anonymize import anonymize_users
+    from ETLUserMetrics.pr_utils.storage import save_parquet, log_metadata, load_init_internal_tables_sql
+    from ETLUserMetrics.pr_utils.transformation import (
+        get_expected_parquet_path,
+        transform_user_data,
+        insert_transformed_data,
+        run_fused_pipeline,
+    )
+    from ETLUserMetrics.pr_utils.utils import run_sql_query
+
+    execution_date = BENCHMARK_EXECUTION_DATE
+    timer = StageTimer()
+
+    with duckdb.connect(str(db_path)) as con:
+        timer.run("init_tables", 0, con.execute, load_init_internal_tables_sql())
+
+    users = timer.run("fetch", persons, generate_synthetic_users, persons, seed)
+    df = timer.run("anonymize", persons, anonymize_users, users)
+    del users
+
+    if mode == "fused":
+        timer.run("fused_load", persons, run_fused_pipeline, df, execution_date, str(raw_path))
+        del df
+    else:
+        parquet_path = timer.run("save_parquet", persons, save_parquet, df, str(raw_path), execution_date)
+        timer.run("log_metadata", persons, log_metadata, df, parquet_path, str(db_path))
+        del df
+
+        loaded = timer.run("load_parquet", persons, pd.read_parquet, get_expected_parquet_path(execution_date))
+        transformed = timer.run("transform", persons, transform_user_data, loaded, execution_date)
+        del loaded
+        timer.run("insert", persons, insert_transformed_data, transformed, execution_date)
+        del transformed
+
+    reporting = {}
+    for sql_file in sorted(REPORTING_SQL_DIR.glob("*.sql")):
+        start = time.perf_counter()
+        run_sql_query(sql_file.name, sql_dir=REPORTING_SQL_DIR)
+        reporting[sql_file.stem] = round(time.perf_counter() - start, 4)
+
+    return {
+        "persons": persons,
+        "mode": mode,
+        "stages": timer.stages,
+        "total_seconds": round(sum(stage["seconds"] for stage in timer.stages), 4),
+        "peak_rss_mb": peak_rss_mb(),
+        "children_peak_rss_mb": peak_rss_mb(resource.RUSAGE_CHILDREN),
+        "parquet_size_mb": directory_size_mb(raw_path),
+        "duckdb_size_mb": directory_size_mb(db_path.parent),
+        "reporting_latency_seconds": reporting,
+    }
+
+
+def _run_scale_in_tmp_dir(persons: int, seed: int, mode: str) -> dict:
+    with tempfile.TemporaryDirectory(prefix=f"pipeline_benchmark_{persons}_") as work_dir:
+        return run_single_scale(persons, work_dir, seed, mode)
+
+
+def run_benchmark(scales: list[int], seed: int = 42, modes: list[str] = ("split",)) -> list[dict]:
+    """
+    Runs the pipeline benchmark for each scale in its own spawned interpreter.
+
+    Args:
+        scales (list[int]): Numbers of persons to benchmark.
+        seed (int): Seed for the synthetic data source.
+        modes (list[str]): Pipeline modes to benchmark at every scale.
+
+    Returns:
+        list[dict]: One report per scale and mode.
+    """
+    # ProcessPoolExecutor workers are not daemonic, so the pipeline may start its own process pool
+    context = multiprocessing.get_context("spawn")
+    reports = []
+    for persons in scales:
+        for mode in modes:
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                reports.append(pool.submit(_run_scale_in_tmp_dir, persons, seed, mode).result())
+    return reports
+
+
+def format_report(reports: list[dict]) -> str:
+    """Renders benchmark reports as a plain-text table per scale."""
+    lines = []
+    for report in reports:
+        lines.append(
+            f"== {report['persons']:,} persons ({report.get('mode', 'split')}) | total {report['total_seconds']:.2f}s | "
+            f"peak RSS {report['peak_rss_mb']} MB | workers peak RSS {report.get('children_peak_rss_mb', '-')} MB | "
+            f"parquet {report['parquet_size_mb']} MB | "
+            f"duckdb {report['duckdb_size_mb']} MB"
+        )
+        lines.append(f"{'stage':<14}{'seconds':>10}{'rows/s':>14}{'peak mem MB':>14}")
+        for stage in report["stages"]:
+            rate = f"{stage['rows_per_second']:,}" if stage["rows_per_second"] else "-"
+            lines.append(f"{stage['stage']:<14}{stage['seconds']:>10.3f}{rate:>14}{stage['peak_memory_mb']:>14}")
+        for query, seconds in report["reporting_latency_seconds"].items():
+            lines.append(f"{'report':<14}{seconds:>10.3f}  {query}")
+        lines.append("")
+    return "\n".join(lines)
+
+
+def main(argv: list[str] = None):
+    parser = argparse.ArgumentParser(description="Benchmark the user metrics pipeline end to end at scale.")
+    parser.add_argument("--persons", type=int, nargs="+", default=[30000], help="Scales to benchmark.")
+    parser.add_argument("--mode", nargs="+", default=["split"], choices=["split", "fused"],
+                        help="Pipeline modes to benchmark.")
+    parser.add_argument("--seed", type=int, default=42, help="Seed for the synthetic data source.")
+    parser.add_argument("--output", help="Optional path for the JSON report.")
+    args = parser.parse_args(argv)
+
+    reports = run_benchmark(args.persons, args.seed, args.mode)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(reports, indent=2))
+    print(format_report(reports))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+import hashlib
+import inspect
+import json
+from datetime import datetime
+from pathlib import Path
+
+import duckdb
+import pandas as pd
+
+from ETLUserMetrics.config.anonymization_config import ANONYMIZATION_CONFIG, NESTED_FIELDS
+from ETLUserMetrics.config.pipeline_config import (
+    ANONYMIZED_TABLE_NAME,
+    FINAL_USER_COLUMNS,
+    INTERNAL_SQL_DIR,
+    DISTINCT_COUNT_MODE,
+    HLL_COLUMN_SETS,
+    HLL_ERROR_BOUND,
+    STAGE_FINGERPRINTS_TABLE_NAME,
+    STAGE_FINGERPRINTS_SQL_FILENAME,
+)
+from ETLUserMetrics.config.quality_config import (
+    QUALITY_CHECKS,
+    DATA_QUALITY_ENABLED,
+    DATA_QUALITY_SAMPLE_PERCENT,
+)
+from ETLUserMetrics.pr_utils.utils import get_logger
+
+logger = get_logger(__name__)
+
+HASH_CHUNK_BYTES = 1024 * 1024
+
+PR_UTILS_DIR = Path(__file__).resolve().parent
+
+# Source files that shape what the transform/insert stages write (data, DQ gate, sketches)
+STAGE_CODE_FILES = [
+    PR_UTILS_DIR / "transformation.py",
+    PR_UTILS_DIR / "memory.py",
+    PR_UTILS_DIR / "parallel.py",
+    PR_UTILS_DIR / "quality.py",
+    PR_UTILS_DIR / "sketches.py",
+    PR_UTILS_DIR / "storage.py",
+    PR_UTILS_DIR.parent / "config" / "quality_config.py",
+    *sorted(INTERNAL_SQL_DIR.glob("*.sql")),
+]
+
+
+def file_sha256(path: Path) -> str:
+    """Returns the SHA-256 hex digest of a file's content, read in 1 MB chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def dataframe_sha256(df: pd.DataFrame) -> str:
+    """Returns a SHA-256 hex digest of a DataFrame's column names and row values."""
+    digest = hashlib.sha256(json.dumps(df.columns.tolist()).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def get_rule_source(rule) -> str:
+    """Returns the source of an anonymization rule, or its bytecode if the source is unavailable."""
+    try:
+        return inspect.getsource(rule).strip()
+    except (OSError, TypeError):
+        return rule.__code__.co_code.hex()
+
+
+def get_config_fingerprint() -> dict:
+    """Returns the configuration that determines the loaded data, DQ results and sketches."""
+    return {
+        "final_user_columns": FINAL_USER_COLUMNS,
+        "nested_fields": NESTED_FIELDS,
+        "anonymization_rules": {field: get_rule_source(rule) for field, rule in sorted(ANONYMIZATION_CONFIG.items())},
+        "quality_checks": QUALITY_CHECKS,
+        "data_quality_enabled": DATA_QUALITY_ENABLED,
+        "data_quality_sample_percent": DATA_QUALITY_SAMPLE_PERCENT,
+        "distinct_count_mode": DISTINCT_COUNT_MODE,
+        "hll_column_sets": HLL_COLUMN_SETS,
+        "hll_error_bound": HLL_ERROR_BOUND,
+    }
+
+
+def get_code_version(paths: list[Path] = STAGE_CODE_FILES) -> str:
+    """Returns a SHA-256 hex digest over the source files implementing a stage."""
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(Path(path).read_bytes())
+    return digest.hexdigest()
+
+
+def compute_fingerprint(inputs: dict) -> str:
+    """
+    Computes a stage fingerprint from its inputs.
+
+    Args:
+        inputs (dict): JSON-serializable description of everything the stage output
+                       depends on (input content hashes, config, code version).
+
+    Returns:
+        str: SHA-256 hex digest of the canonical JSON form of `inputs`.
+    """
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def is_stage_cached(
+    con: duckdb.DuckDBPyConnection,
+    stage: str,
+    execution_date: str,
+    fingerprint: str,
+    table_name: str = ANONYMIZED_TABLE_NAME,
+) -> bool:
+    """
+    Checks whether a stage already ran successfully with the same fingerprint.
+
+    The recorded row count must also still match the partition in `table_name`,
+    so a dropped or modified table invalidates the cache.
+
+    Args:
+        con (duckdb.DuckDBPyConnection): Open connection to the pipeline database.
+        stage (str): Stage name.
+        execution_date (str): Execution date in 'YYYY-MM-DD' format.
+        fingerprint (str): Fingerprint of the current inputs.
+        table_name (str): Table the stage writes to.
+
+    Returns:
+        bool: True if the stage can be skipped.
+    """
+    con.execute((INTERNAL_SQL_DIR / STAGE_FINGERPRINTS_SQL_FILENAME).read_text())
+    last_run = con.execute(
+        f"""
+        SELECT fingerprint, row_count FROM {STAGE_FINGERPRINTS_TABLE_NAME}
+        WHERE stage = ? AND execution_date = ?
+        ORDER BY completed_at DESC
+        LIMIT 1
+        """,
+        (stage, execution_date)
+    ).fetchone()
+    if last_run is None or last_run[0] != fingerprint:
+        return False
+
+    try:
+        current_rows = con.execute(
+            f"SELECT COUNT(*) FROM {table_name} WHERE ingestion_date = ?", (execution_date,)
+        ).fetchone()[0]
+    except duckdb.CatalogException:
+        return False
+    return current_rows == last_run[1]
+
+
+def record_stage_run(
+    con: duckdb.DuckDBPyConnection,
+    stage: str,
+    execution_date: str,
+    fingerprint: str,
+    row_count: int,
+):
+    """Records a successful stage run with its fingerprint and output row count."""
+    con.execute((INTERNAL_SQL_DIR / STAGE_FINGERPRINTS_SQL_FILENAME).read_text())
+    con.execute(
+        f"INSERT INTO {STAGE_FINGERPRINTS_TABLE_NAME} VALUES (?, ?, ?, ?, ?)",
+        (stage, execution_date, fingerprint, row_count, datetime.utcnow())
+    )
+    logger.info(f"Recorded fingerprint for stage '{stage}' ({execution_date}): {fingerprint[:12]}")
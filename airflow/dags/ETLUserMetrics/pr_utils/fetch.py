@@ -19,8 +19,6 @@ from ETLUserMetrics.config.pipeline_config import (
 # Logger setup for tracking progress and errors
 logger = logging.getLogger(__name__)
 
-# Create a single requests session for efficiency (reuses TCP connections)
-session = requests.Session()
 HEADERS = {
     "User-Agent": "faker-api-client/1.0"  # Identifies your script to the server
 }
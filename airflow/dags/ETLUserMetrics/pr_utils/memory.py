@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+
+from ETLUserMetrics.pr_utils.utils import get_logger
+
+logger = get_logger(__name__)
+
+# Text columns with at most this share of distinct values are stored as categoricals
+CATEGORY_MAX_UNIQUE_RATIO = 0.5
+
+
+def memory_footprint_mb(df: pd.DataFrame) -> float:
+    """Returns the deep memory usage of a DataFrame in MB (including Python string objects)."""
+    return round(df.memory_usage(deep=True).sum() / (1024 * 1024), 2)
+
+
+def log_memory_footprint(df: pd.DataFrame, stage: str) -> float:
+    """
+    Logs and returns the memory footprint of a DataFrame after a pipeline stage.
+
+    Args:
+        df (pd.DataFrame): DataFrame to measure.
+        stage (str): Stage name used in the log line.
+
+    Returns:
+        float: Deep memory usage in MB.
+    """
+    footprint = memory_footprint_mb(df)
+    logger.info(f"[{stage}] DataFrame memory footprint: {footprint} MB for {len(df)} rows")
+    return footprint
+
+
+def is_text_column(series: pd.Series) -> bool:
+    """True for object/string columns that are not already categorical."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return False
+    return series.dtype == object or pd.api.types.is_string_dtype(series.dtype)
+
+
+def compact_dataframe(df: pd.DataFrame, max_unique_ratio: float = CATEGORY_MAX_UNIQUE_RATIO) -> pd.DataFrame:
+    """
+    Converts a DataFrame to a memory-compact representation, in place.
+
+    - Low-cardinality text columns (including constant '****' masks) become categoricals,
+      so each distinct string is stored once and rows hold 1-2 byte codes.
+    - Integer columns are downcast to the smallest integer type that fits.
+    - Columns holding unhashable values (e.g. nested dicts) are left untouched.
+
+    Categoricals are written to Parquet as dictionary-encoded columns and registered
+    in DuckDB as ENUMs, so the compact form is kept across the whole pipeline.
+
+    Args:
+        df (pd.DataFrame): DataFrame to compact.
+        max_unique_ratio (float): Max share of distinct values for a column to become categorical.
+
+    Returns:
+        pd.DataFrame: The same DataFrame, with compact dtypes.
+    """
+    for column in df.columns:
+        series = df[column]
+
+        if pd.api.types.is_integer_dtype(series.dtype):
+            df[column] = pd.to_numeric(series, downcast="integer")
+        elif is_text_column(series) and len(series) > 0:
+            try:
+                unique_ratio = series.nunique(dropna=False) / len(series)
+            except TypeError:
+                continue
+            if unique_ratio <= max_unique_ratio:
+                df[column] = series.astype("category")
+
+    return df
+
+
+def map_categories(series: pd.Series, func) -> pd.Series:
+    """
+    Applies a scalar function once per distinct value and returns a categorical Series.
+
+    Equivalent to `series.apply(func).astype("category")`, but `func` runs on the
+    distinct values only and rows are remapped through their category codes.
+
+    Args:
+        series (pd.Series): Input values (any dtype; missing values are passed to `func` as NaN).
+        func (callable): Scalar function to apply.
+
+    Returns:
+        pd.Series: Categorical Series with the same index as `series`.
+    """
+    categorical = series.astype("category")
+    codes = categorical.cat.codes.to_numpy()
+
+    mapped = [func(value) for value in categorical.cat.categories]
+    if (codes == -1).any():
+        # Missing values have code -1, which indexes the last entry
+        mapped.append(func(np.nan))
+
+    # pd.Categorical drops None/NaN results (code -1) and tolerates mixed types, unlike np.unique
+    mapped = pd.Categorical(mapped)
+    result = pd.Categorical.from_codes(mapped.codes[codes], categories=mapped.categories)
+    return pd.Series(result, index=series.index, name=series.name)
@@ -1,17 +1,120 @@
 from airflow.models import BaseOperator
 from airflow.utils.decorators import apply_defaults
-import duckdb
+import time
+from datetime import datetime
 from pathlib import Path
-from ETLUserMetrics.config.pipeline_config import DUCKDB_PATH
+from ETLUserMetrics.config.pipeline_config import DUCKDB_PATH, QUERY_PROFILING_ENABLED
+
+PROFILING_FORMATS = ("json", "query_tree")
+OUTPUT_FORMATS = ("parquet", "arrow")
 
 
 class DuckDBExecuteQueryOperator(BaseOperator):
+    """
+    Executes a SQL file against DuckDB.
+
+    - Binds `parameters` as DuckDB named parameters (`$ingestion_date`), never by string formatting.
+    - Applies per-task `threads`, `memory_limit` and `temp_directory` settings to the connection.
+    - Optionally profiles the run (`json` or `query_tree`, i.e. EXPLAIN ANALYZE output) into `profile_dir`.
+      With QUERY_PROFILING_ENABLED, JSON profiles are also recorded into the `query_profiles` table.
+    - Optionally streams the result of the last statement to a Parquet or Arrow IPC file
+      and returns only its path, so the data never goes through XCom.
+
+    Args:
+        sql_path (str): Path to the .sql file to execute.
+        parameters (dict, optional): Named parameters bound to `$name` placeholders. Templated.
+        db_path (str, optional): Path to the DuckDB file. Defaults to DUCKDB_PATH.
+        threads (int, optional): DuckDB worker threads for this task.
+        memory_limit (str, optional): DuckDB memory limit for this task (e.g. '2GB').
+        temp_directory (str, optional): Spill directory for out-of-memory operators.
+        profiling (str, optional): One of 'json' or 'query_tree'. Disabled if None.
+        profile_dir (str, optional): Directory for profiling artifacts. Templated.
+        output_path (str, optional): File the query result is written to. Templated.
+        output_format (str): 'parquet' or 'arrow'. Defaults to 'parquet'.
+    """
+
+    template_fields = ("sql_path", "parameters", "output_path", "profile_dir")
+
     @apply_defaults
-    def __init__(self, sql_path: str, *args, **kwargs):
+    def __init__(
+        self,
+        sql_path: str,
+        parameters: dict = None,
+        db_path: str = DUCKDB_PATH,
+        threads: int = None,
+        memory_limit: str = None,
+        temp_directory: str = None,
+        profiling: str = None,
+        profile_dir: str = None,
+        output_path: str = None,
+        output_format: str = "parquet",
+        *args,
+        **kwargs
+    ):
         super().__init__(*args, **kwargs)
+        if profiling is not None and profiling not in PROFILING_FORMATS:
+            raise ValueError(f"Unsupported profiling format: {profiling}. Use one of {PROFILING_FORMATS}")
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Unsupported output format: {output_format}. Use one of {OUTPUT_FORMATS}")
+
         self.sql_path = sql_path
+        self.parameters = parameters or {}
+        self.db_path = db_path
+        self.threads = threads
+        self.memory_limit = memory_limit
+        self.temp_directory = temp_directory
+        self.profiling = profiling or ("json" if QUERY_PROFILING_ENABLED else None)
+        self.profile_dir = profile_dir
+        self.output_path = output_path
+        self.output_format = output_format
+
+    def build_config(self) -> dict:
+        """Returns the DuckDB connection config for the per-task resource settings."""
+        config = {}
+        if self.threads is not None:
+            config["threads"] = int(self.threads)
+        if self.memory_limit is not None:
+            config["memory_limit"] = self.memory_limit
+        if self.temp_directory is not None:
+            config["temp_directory"] = self.temp_directory
+        return config
+
+    def get_profile_path(self) -> Path:
+        """Returns the artifact path for this run's profiling output."""
+        suffix = "json" if self.profiling == "json" else "txt"
+        timestamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+        profile_dir = Path(self.profile_dir) if self.profile_dir else Path(self.db_path).parent / "profiles"
+        profile_dir.mkdir(parents=True, exist_ok=True)
+        return profile_dir / f"{self.task_id}_{timestamp}.{suffix}"
+
+    def write_result(self, result) -> Path:
+        """Streams the pending query result to `output_path` in record batches."""
+        import pyarrow.ipc as ipc
+        import pyarrow.parquet as pq
+
+        output_path = Path(self.output_path)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        reader = result.fetch_record_batch()
+
+        if self.output_format == "parquet":
+            writer = pq.ParquetWriter(output_path, reader.schema, compression="snappy")
+        else:
+            writer = ipc.new_file(output_path, reader.schema)
+
+        rows = 0
+        with writer:
+            for batch in reader:
+                writer.write_batch(batch)
+                rows += batch.num_rows
+
+        self.log.info(f"Wrote {rows} rows to {output_path} ({self.output_format})")
+        return output_path
 
     def execute(self, context):
+        # Imported here so that DAG files using this operator stay cheap to parse
+        import duckdb
+        from ETLUserMetrics.pr_utils.profiling import record_profile
+
         sql_file = Path(self.sql_path)
         if not sql_file.exists():
             raise FileNotFoundError(f"SQL file not found: {self.sql_path}")
@@ -19,6 +122,35 @@ class DuckDBExecuteQueryOperator(BaseOperator):
         with open(sql_file, "r") as f:
             sql = f.read()
 
-        conn = duckdb.connect(DUCKDB_PATH)
-        conn.execute(sql)
-        self.log.info(f"Executed DuckDB SQL: {self.sql_path}")
+        output_path = None
+        with duckdb.connect(self.db_path, config=self.build_config()) as conn:
+            if self.profiling:
+                profile_path = self.get_profile_path()
+                conn.execute(f"PRAGMA enable_profiling='{self.profiling}'")
+                conn.execute(f"PRAGMA profiling_output='{profile_path}'")
+
+            start = time.perf_counter()
+            result = conn.execute(sql, self.parameters) if self.parameters else conn.execute(sql)
+            self.log.info(f"Executed DuckDB SQL: {self.sql_path}")
+
+            if self.output_path:
+                output_path = self.write_result(result)
+
+            if self.profiling:
+                # The profile is only flushed once the result has been fully consumed
+                if not self.output_path:
+                    for _ in result.fetch_record_batch():
+                        pass
+                latency = time.perf_counter() - start
+                conn.execute("PRAGMA disable_profiling")
+                conn.execute("RESET profiling_output")
+                if QUERY_PROFILING_ENABLED and self.profiling == "json":
+                    record_profile(conn, sql, sql_file.name, latency, profile_path=profile_path, task_id=self.task_id)
+                # DuckDB writes no profile for some statements (e.g. DDL-only files)
+                if profile_path.exists():
+                    self.log.info(f"Saved DuckDB profile to: {profile_path}")
+                    context["ti"].xcom_push(key="profile_path", value=str(profile_path))
+                else:
+                    self.log.info(f"DuckDB wrote no profile for: {self.sql_path}")
+
+        return str(output_path) if output_path else None
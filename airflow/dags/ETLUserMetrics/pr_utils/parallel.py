@@ -0,0 +1,302 @@
+import multiprocessing
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+
+import pandas as pd
+import pyarrow as pa
+
+from ETLUserMetrics.config.pipeline_config import PARALLEL_WORKERS, PARALLEL_MIN_ROWS
+from ETLUserMetrics.pr_utils.utils import get_logger
+
+logger = get_logger(__name__)
+
+# Raised by pyarrow for values it cannot store (e.g. a rule returning mixed types)
+ARROW_CONVERSION_ERRORS = (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError)
+
+# Values pandas infers for object columns that Arrow stores without loss
+ARROW_SAFE_KINDS = {"string", "empty", "bytes", "boolean"}
+
+# One worker's output: Arrow IPC segment (name, size) or None, pickled object columns,
+# the result's column order and its row count
+ChunkResult = namedtuple("ChunkResult", ["shared", "objects", "columns", "rows"])
+
+# tmpfs backing POSIX shared memory on Linux; writing past its free space kills the writer with SIGBUS
+SHM_DIR = "/dev/shm"
+
+# (chunk function, shared input segment name, input size, per-chunk result budget in bytes).
+# Set right before the pool forks,
+# so workers inherit it: lambdas and closures work and nothing is pickled on the way in.
+_CHUNK_TASK = None
+
+# Worker-side attachments to the shared input, kept open until the worker exits
+_ATTACHED_INPUTS = {}
+
+
+def get_worker_count(requested: int = PARALLEL_WORKERS) -> int:
+    """
+    Returns the number of worker processes to use.
+
+    Args:
+        requested (int): Explicit worker count; 0 or less picks one worker per usable core.
+
+    Returns:
+        int: Worker count (at least 1).
+    """
+    if requested > 0:
+        return requested
+    try:
+        # Respects CPU pinning / container cpusets, unlike os.cpu_count()
+        return max(1, len(os.sched_getaffinity(0)))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def get_chunk_bounds(n_rows: int, n_chunks: int) -> list[tuple[int, int]]:
+    """Splits `n_rows` into at most `n_chunks` contiguous, near-equal [start, stop) ranges."""
+    n_chunks = max(1, min(n_chunks, n_rows))
+    edges = [n_rows * i // n_chunks for i in range(n_chunks + 1)]
+    return list(zip(edges[:-1], edges[1:]))
+
+
+def can_fork() -> bool:
+    """True if worker processes can be forked (Linux, i.e. the Airflow workers)."""
+    return "fork" in multiprocessing.get_all_start_methods()
+
+
+class SharedMemoryFull(OSError):
+    """Raised when a table would not fit into the free shared memory."""
+
+
+def shm_free_bytes() -> int:
+    """Returns the free space of SHM_DIR in bytes, or None where it cannot be measured."""
+    try:
+        stats = os.statvfs(SHM_DIR)
+    except (OSError, AttributeError):
+        return None
+    return stats.f_bavail * stats.f_frsize
+
+
+def write_shared_table(table: pa.Table, max_bytes: int = None) -> tuple[shared_memory.SharedMemory, int]:
+    """
+    Writes an Arrow table as an IPC stream into a new shared-memory segment.
+
+    Args:
+        table (pa.Table): Table to share.
+        max_bytes (int, optional): Largest stream allowed in shared memory. Unlimited if None.
+
+    Returns:
+        tuple: (open SharedMemory segment, stream size in bytes). The caller unlinks the segment.
+
+    Raises:
+        SharedMemoryFull: If the stream is larger than `max_bytes`.
+    """
+    sizer = pa.MockOutputStream()
+    with pa.ipc.new_stream(sizer, table.schema) as writer:
+        writer.write_table(table)
+    size = sizer.size()
+    if max_bytes is not None and size > max_bytes:
+        raise SharedMemoryFull(f"{size} bytes do not fit into the {max_bytes} bytes of shared memory available")
+
+    shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    sink = pa.FixedSizeBufferWriter(pa.py_buffer(shm.buf))
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    sink.close()
+    return shm, size
+
+
+def read_shared_table(name: str, size: int) -> pa.Table:
+    """Copies an Arrow IPC stream out of a shared-memory segment and releases the segment."""
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        data = pa.py_buffer(bytes(shm.buf[:size]))
+    finally:
+        shm.close()
+        shm.unlink()
+    return pa.ipc.open_stream(data).read_all()
+
+
+def get_object_columns(df: pd.DataFrame) -> list[str]:
+    """
+    Returns the columns that cannot make an exact Arrow round trip.
+
+    Nested values (dicts, lists) would come back as structs with every key filled in,
+    and mixed-type columns cannot be stored at all, so these are pickled instead.
+    """
+    return [
+        column for column in df.columns
+        if df[column].dtype == object and pd.api.types.infer_dtype(df[column], skipna=True) not in ARROW_SAFE_KINDS
+    ]
+
+
+def _run_chunk(start: int, stop: int):
+    func, input_name, input_size, result_budget = _CHUNK_TASK
+    if input_name is None:
+        result = func(start, stop)
+    else:
+        if input_name not in _ATTACHED_INPUTS:
+            shm = shared_memory.SharedMemory(name=input_name)
+            # Zero-copy view of the parent's table; only this chunk's rows are converted
+            _ATTACHED_INPUTS[input_name] = (shm, pa.ipc.open_stream(pa.py_buffer(shm.buf[:input_size])).read_all())
+        table = _ATTACHED_INPUTS[input_name][1]
+        result = func(table.slice(start, stop - start).to_pandas())
+
+    result = result.reset_index(drop=True)
+    object_columns = get_object_columns(result)
+    try:
+        output, size = write_shared_table(
+            pa.Table.from_pandas(result.drop(columns=object_columns), preserve_index=False), result_budget
+        )
+    except (*ARROW_CONVERSION_ERRORS, SharedMemoryFull):
+        # Not representable in Arrow, or /dev/shm too small: fall back to returning the pickled DataFrame
+        return ChunkResult(None, result.copy(deep=True), result.columns.tolist(), len(result))
+    output.close()
+    return ChunkResult((output.name, size), result[object_columns].copy(deep=True), result.columns.tolist(), len(result))
+
+
+def concat_arrow_tables(tables: list[pa.Table]) -> pa.Table:
+    """Concatenates tables on the union of their schemas; columns missing from a table become nulls."""
+    schema = pa.unify_schemas([table.schema for table in tables], promote_options="permissive")
+    aligned = []
+    for table in tables:
+        for field in schema:
+            if field.name not in table.column_names:
+                table = table.append_column(field.name, pa.nulls(len(table), field.type))
+        aligned.append(table.select(schema.names))
+    return pa.concat_tables(aligned, promote_options="permissive")
+
+
+def combine_chunk_results(results: list) -> pd.DataFrame:
+    """
+    Concatenates chunk results in chunk order into one DataFrame with a fresh RangeIndex.
+
+    Arrow parts are concatenated and converted once, so dictionary columns come back as
+    one categorical; pickled object columns are re-attached in their original position.
+    If the chunks' Arrow types conflict (e.g. a rule returned ints in one chunk and
+    strings in another), every chunk is converted separately and joined by pandas.
+    """
+    tables = [read_shared_table(*result.shared) if result.shared else None for result in results]
+    columns = list(dict.fromkeys(column for result in results for column in result.columns))
+    object_columns = list(dict.fromkeys(column for result in results for column in result.objects.columns))
+
+    def chunk_objects(result, table, column) -> pd.Series:
+        if column in result.objects.columns:
+            return result.objects[column]
+        if table is not None and column in table.column_names:
+            # Arrow-typed in this chunk only; back to plain Python values like the other chunks
+            return pd.Series(table.column(column).to_pylist(), dtype=object)
+        return pd.Series([None] * result.rows, dtype=object)
+
+    if all(table is not None for table in tables):
+        try:
+            arrow_tables = [table.select([c for c in table.column_names if c not in object_columns]) for table in tables]
+            combined = concat_arrow_tables(arrow_tables).to_pandas()
+            for column in object_columns:
+                combined[column] = pd.concat(
+                    [chunk_objects(result, table, column) for result, table in zip(results, tables)], ignore_index=True
+                )
+            return combined[columns]
+        except ARROW_CONVERSION_ERRORS:
+            logger.info("Chunk results have conflicting Arrow types, concatenating them in pandas")
+
+    frames = [
+        pd.concat([table.to_pandas() if table is not None else pd.DataFrame(index=pd.RangeIndex(result.rows)),
+                   result.objects], axis=1)
+        for result, table in zip(results, tables)
+    ]
+    return pd.concat(frames, ignore_index=True)[columns]
+
+
+def _map_chunks(func, n_rows: int, shared_input: tuple, workers: int) -> pd.DataFrame:
+    global _CHUNK_TASK
+    bounds = get_chunk_bounds(n_rows, workers)
+    logger.info(f"Processing {n_rows} rows in {len(bounds)} chunks across {workers} worker processes")
+
+    # Every chunk's result sits in shared memory until all are collected, so each gets an equal share
+    free_bytes = shm_free_bytes()
+    result_budget = None if free_bytes is None else free_bytes // len(bounds)
+
+    # Workers must share the parent's tracker, or theirs would unlink results when they exit
+    resource_tracker.ensure_running()
+    _CHUNK_TASK = (func, *shared_input, result_budget)
+    try:
+        with ProcessPoolExecutor(max_workers=len(bounds), mp_context=multiprocessing.get_context("fork")) as pool:
+            # map() yields results in submission order, so output order matches input order
+            results = list(pool.map(_run_chunk, *zip(*bounds)))
+    finally:
+        _CHUNK_TASK = None
+    return combine_chunk_results(results)
+
+
+def should_parallelize(n_rows: int, workers: int, min_rows: int) -> bool:
+    """True if a workload is large enough, and the platform able, to use a process pool."""
+    # Daemonic processes (e.g. multiprocessing.Pool workers) may not start children
+    return workers > 1 and n_rows >= min_rows and can_fork() and not multiprocessing.current_process().daemon
+
+
+def map_records(records: list, func, workers: int = None, min_rows: int = PARALLEL_MIN_ROWS) -> pd.DataFrame:
+    """
+    Applies `func` to contiguous slices of a list of records across a process pool.
+
+    Workers are forked, so they read `records` from inherited memory instead of
+    receiving pickled copies; each result comes back as an Arrow IPC stream in
+    shared memory.
+
+    Args:
+        records (list): Input records (e.g. raw API user dicts).
+        func (callable): `func(records_slice, start_index) -> pd.DataFrame`.
+        workers (int, optional): Worker count. Defaults to get_worker_count().
+        min_rows (int): Inputs smaller than this run in-process.
+
+    Returns:
+        pd.DataFrame: Chunk results concatenated in input order.
+    """
+    workers = workers or get_worker_count()
+    if not should_parallelize(len(records), workers, min_rows):
+        return func(records, 0)
+
+    return _map_chunks(lambda start, stop: func(records[start:stop], start), len(records), (None, 0), workers)
+
+
+def map_dataframe(
+    data: pd.DataFrame | pa.Table,
+    func,
+    workers: int = None,
+    min_rows: int = PARALLEL_MIN_ROWS,
+) -> pd.DataFrame:
+    """
+    Applies `func` to contiguous row chunks of a DataFrame or Arrow table across a process pool.
+
+    The input is written once to a shared-memory Arrow buffer that every worker maps
+    without copying; each worker converts only its own rows to pandas and returns its
+    result the same way. If /dev/shm is too small for the input it runs in-process, and
+    chunk results that do not fit are pickled instead.
+
+    Args:
+        data (pd.DataFrame | pa.Table): Input rows.
+        func (callable): `func(chunk_df) -> pd.DataFrame`, applied to each chunk.
+        workers (int, optional): Worker count. Defaults to get_worker_count().
+        min_rows (int): Inputs smaller than this run in-process.
+
+    Returns:
+        pd.DataFrame: Chunk results concatenated in input order, with a fresh RangeIndex.
+    """
+    workers = workers or get_worker_count()
+    if not should_parallelize(len(data), workers, min_rows):
+        return func(data.to_pandas() if isinstance(data, pa.Table) else data)
+
+    table = data if isinstance(data, pa.Table) else pa.Table.from_pandas(data, preserve_index=False)
+    free_bytes = shm_free_bytes()
+    try:
+        # Leave at least as much room again for the chunk results
+        shm, size = write_shared_table(table, None if free_bytes is None else free_bytes // 2)
+    except SharedMemoryFull as e:
+        logger.warning(f"Running in-process: {e}")
+        return func(data.to_pandas() if isinstance(data, pa.Table) else data)
+    try:
+        return _map_chunks(func, len(table), (shm.name, size), workers)
+    finally:
+        shm.close()
+        shm.unlink()
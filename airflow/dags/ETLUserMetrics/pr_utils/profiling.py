@@ -0,0 +1,384 @@
+import argparse
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+import duckdb
+import pandas as pd
+
+from ETLUserMetrics.config.pipeline_config import (
+    DUCKDB_PATH,
+    INTERNAL_SQL_DIR,
+    QUERY_PROFILING_ENABLED,
+    QUERY_PROFILES_TABLE_NAME,
+    QUERY_PROFILES_SQL_FILENAME,
+)
+
+logger = logging.getLogger(__name__)
+
+MEMORY_SAMPLE_INTERVAL_SECONDS = 0.005
+
+# Profile rows held back per connection (id(con) -> rows) while it runs an explicit transaction
+_DEFERRED_PROFILES = {}
+
+
+def get_task_id() -> str:
+    """
+    Returns the Airflow task id of the running task instance.
+
+    Airflow exports the task context as AIRFLOW_CTX_* environment variables
+    before running a task callable; outside Airflow the statement is tagged 'adhoc'.
+    """
+    return os.getenv("AIRFLOW_CTX_TASK_ID", "adhoc")
+
+
+def flatten_operators(node: dict, depth: int = 0) -> list[dict]:
+    """
+    Flattens a DuckDB JSON profile tree into a list of operator timings.
+
+    Handles both the 0.10 key names (name/timing/cardinality) and the
+    1.x key names (operator_type/operator_timing/operator_cardinality).
+
+    Args:
+        node (dict): A node of the JSON profile tree.
+        depth (int): Depth of the node in the plan (root = 0).
+
+    Returns:
+        list[dict]: One entry per operator with name, timing, cardinality and rows scanned.
+    """
+    operators = []
+    for child in node.get("children", []):
+        name = child.get("operator_type") or child.get("operator_name") or child.get("name")
+        operators.append({
+            "operator": name,
+            "depth": depth,
+            "timing": child.get("operator_timing", child.get("timing", 0.0)),
+            "cardinality": child.get("operator_cardinality", child.get("cardinality", 0)),
+            "rows_scanned": child.get("operator_rows_scanned"),
+        })
+        operators.extend(flatten_operators(child, depth + 1))
+    return operators
+
+
+def summarize_profile(profile: dict) -> dict:
+    """
+    Extracts the query-level metrics from a DuckDB JSON profile.
+
+    Args:
+        profile (dict): Parsed JSON profile written by DuckDB.
+
+    Returns:
+        dict: latency, rows scanned, peak memory and the flattened operator list.
+    """
+    operators = flatten_operators(profile)
+
+    rows_scanned = profile.get("cumulative_rows_scanned")
+    if rows_scanned is None:
+        # Older DuckDB versions only report cardinality; scans emit the rows they read
+        rows_scanned = sum(op["cardinality"] or 0 for op in operators if "SCAN" in (op["operator"] or ""))
+
+    return {
+        "latency_seconds": profile.get("latency", profile.get("timing")),
+        "rows_scanned": rows_scanned,
+        "peak_memory_bytes": profile.get("system_peak_buffer_memory"),
+        "operators": operators,
+    }
+
+
+class BufferMemorySampler:
+    """
+    Tracks DuckDB's peak buffer-manager memory while a statement runs.
+
+    The JSON profile only reports peak memory from DuckDB 1.1 on; the pinned 0.10
+    exposes current usage through duckdb_memory(), so a second cursor polls it on a
+    background thread for the duration of the statement.
+    """
+
+    def __init__(self, con: duckdb.DuckDBPyConnection, interval: float = MEMORY_SAMPLE_INTERVAL_SECONDS):
+        self.cursor = con.cursor()
+        self.interval = interval
+        self.peak_bytes = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._poll, daemon=True)
+
+    def _sample(self):
+        try:
+            used = self.cursor.execute("SELECT COALESCE(SUM(memory_usage_bytes), 0) FROM duckdb_memory()").fetchone()[0]
+        except duckdb.Error:
+            self._stop.set()
+            return
+        self.peak_bytes = used if self.peak_bytes is None else max(self.peak_bytes, used)
+
+    def _poll(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def __enter__(self):
+        self._sample()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+        self.cursor.close()
+
+
+def ensure_profiles_table(con: duckdb.DuckDBPyConnection):
+    """Creates the query profiles table if it does not exist yet."""
+    con.execute((INTERNAL_SQL_DIR / QUERY_PROFILES_SQL_FILENAME).read_text())
+
+
+def record_profile(
+    con: duckdb.DuckDBPyConnection,
+    sql: str,
+    sql_name: str,
+    latency_seconds: float,
+    rows_returned: int = None,
+    profile_path: Path = None,
+    task_id: str = None,
+    peak_memory_bytes: int = None,
+):
+    """
+    Stores one profiled statement into the query profiles table.
+
+    If DuckDB did not write a profile for the statement (e.g. DDL or metadata-only
+    queries), the wall-clock latency is stored without a plan.
+
+    Args:
+        con (duckdb.DuckDBPyConnection): Open connection to the pipeline database.
+        sql (str): Statement text.
+        sql_name (str): SQL file name or a short label for inline statements.
+        latency_seconds (float): Wall-clock latency measured by the caller.
+        rows_returned (int, optional): Number of rows returned by the statement.
+        profile_path (Path, optional): Path to the JSON profile written by DuckDB.
+        task_id (str, optional): Task tag. Defaults to the running Airflow task.
+        peak_memory_bytes (int, optional): Sampled peak memory, used when the profile has none.
+    """
+    summary = {
+        "latency_seconds": latency_seconds,
+        "rows_scanned": None,
+        "peak_memory_bytes": peak_memory_bytes,
+        "operators": [],
+    }
+    plan = None
+    if profile_path is not None and Path(profile_path).exists() and Path(profile_path).stat().st_size > 0:
+        plan = Path(profile_path).read_text()
+        summary.update({k: v for k, v in summarize_profile(json.loads(plan)).items() if v is not None})
+
+    row = (
+        datetime.utcnow(),
+        task_id or get_task_id(),
+        sql_name,
+        sql,
+        summary["latency_seconds"],
+        rows_returned,
+        summary["rows_scanned"],
+        summary["peak_memory_bytes"],
+        json.dumps(summary["operators"]),
+        plan,
+    )
+    if id(con) in _DEFERRED_PROFILES:
+        _DEFERRED_PROFILES[id(con)].append(row)
+    else:
+        write_profiles(con, [row])
+
+
+def write_profiles(con: duckdb.DuckDBPyConnection, rows: list[tuple]):
+    """Inserts profile rows (in record_profile's column order) into the query profiles table."""
+    ensure_profiles_table(con)
+    con.executemany(
+        f"""
+        INSERT INTO {QUERY_PROFILES_TABLE_NAME} (
+            profiled_at, task_id, sql_name, query_text, latency_seconds, rows_returned,
+            rows_scanned, peak_memory_bytes, operator_timings, query_plan
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        rows
+    )
+
+
+def stop_profiling(con: duckdb.DuckDBPyConnection):
+    """Switches DuckDB's profiler off and resets its output path."""
+    con.execute("PRAGMA disable_profiling")
+    con.execute("RESET profiling_output")
+
+
+@contextmanager
+def deferred_profiles(con: duckdb.DuckDBPyConnection):
+    """
+    Holds back profile rows recorded on `con` and writes them when the block exits.
+
+    Wrap explicit transactions with it and end the block after COMMIT/ROLLBACK:
+    rows written inside the transaction would be discarded by a rollback, losing the
+    profiles of exactly the runs that need diagnosing. If the block raises, the open
+    transaction is rolled back and profiling is switched off before the rows are written.
+
+    Args:
+        con (duckdb.DuckDBPyConnection): Connection running the transaction.
+    """
+    _DEFERRED_PROFILES[id(con)] = []
+    try:
+        yield
+    except Exception:
+        try:
+            con.execute("ROLLBACK")
+        except duckdb.Error:
+            pass  # no transaction was open
+        # A statement that failed mid-transaction may have left the profiler on
+        stop_profiling(con)
+        raise
+    finally:
+        rows = _DEFERRED_PROFILES.pop(id(con))
+        if rows:
+            write_profiles(con, rows)
+
+
+def execute_query(
+    con: duckdb.DuckDBPyConnection,
+    sql: str,
+    params=None,
+    sql_name: str = "inline",
+    enabled: bool = QUERY_PROFILING_ENABLED,
+) -> pd.DataFrame:
+    """
+    Executes a statement and returns its result as a DataFrame, profiling it when enabled.
+
+    With profiling enabled, DuckDB's JSON profiler is switched on for the statement
+    only, and the plan, operator timings, rows scanned and peak memory are recorded
+    into the query profiles table tagged with the task and `sql_name`.
+
+    Args:
+        con (duckdb.DuckDBPyConnection): Open connection to the pipeline database.
+        sql (str): Statement to execute.
+        params (tuple | dict, optional): Bound parameters for the statement.
+        sql_name (str): SQL file name or a short label for inline statements.
+        enabled (bool): Whether to profile. Defaults to QUERY_PROFILING_ENABLED.
+
+    Returns:
+        pd.DataFrame: Result of the statement.
+    """
+    if not enabled:
+        return con.execute(sql, params).fetchdf() if params is not None else con.execute(sql).fetchdf()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        profile_path = Path(tmp_dir) / "profile.json"
+        con.execute("PRAGMA enable_profiling='json'")
+        con.execute(f"PRAGMA profiling_output='{profile_path}'")
+
+        start = time.perf_counter()
+        try:
+            with BufferMemorySampler(con) as memory:
+                result = con.execute(sql, params).fetchdf() if params is not None else con.execute(sql).fetchdf()
+        except Exception:
+            # Inside an aborted transaction the PRAGMAs fail too; deferred_profiles retries
+            # after its ROLLBACK. Either way the statement's own error is what surfaces.
+            try:
+                stop_profiling(con)
+            except duckdb.Error:
+                pass
+            raise
+        latency = time.perf_counter() - start
+        stop_profiling(con)
+
+        record_profile(con, sql, sql_name, latency, len(result), profile_path, peak_memory_bytes=memory.peak_bytes)
+
+    logger.info(f"Profiled '{sql_name}' in {latency:.3f}s")
+    return result
+
+
+def slowest_statements(con: duckdb.DuckDBPyConnection, top: int = 10) -> pd.DataFrame:
+    """
+    Ranks statements by their mean latency across all recorded runs.
+
+    Args:
+        con (duckdb.DuckDBPyConnection): Open connection to the pipeline database.
+        top (int): Number of statements to return.
+
+    Returns:
+        pd.DataFrame: task_id, sql_name, run count, mean/max latency, rows scanned and peak memory.
+    """
+    return con.execute(
+        f"""
+        SELECT
+            task_id,
+            sql_name,
+            COUNT(*) AS runs,
+            ROUND(AVG(latency_seconds), 4) AS avg_latency_seconds,
+            ROUND(MAX(latency_seconds), 4) AS max_latency_seconds,
+            MAX(rows_scanned) AS max_rows_scanned,
+            MAX(peak_memory_bytes) AS max_peak_memory_bytes
+        FROM {QUERY_PROFILES_TABLE_NAME}
+        GROUP BY task_id, sql_name
+        ORDER BY avg_latency_seconds DESC
+        LIMIT ?
+        """,
+        (top,)
+    ).fetchdf()
+
+
+def slowest_operators(con: duckdb.DuckDBPyConnection, top: int = 10) -> pd.DataFrame:
+    """
+    Ranks operators by their total time across all recorded runs.
+
+    Args:
+        con (duckdb.DuckDBPyConnection): Open connection to the pipeline database.
+        top (int): Number of operators to return.
+
+    Returns:
+        pd.DataFrame: sql_name, operator, occurrences, total and mean timing, total cardinality.
+    """
+    profiles = con.execute(
+        f"SELECT sql_name, operator_timings FROM {QUERY_PROFILES_TABLE_NAME}"
+    ).fetchdf()
+
+    rows = [
+        {"sql_name": sql_name, **op}
+        for sql_name, timings in zip(profiles["sql_name"], profiles["operator_timings"])
+        for op in json.loads(timings or "[]")
+    ]
+    if not rows:
+        return pd.DataFrame(columns=["sql_name", "operator", "occurrences", "total_timing", "avg_timing", "total_cardinality"])
+
+    operators = pd.DataFrame(rows)
+    ranked = (
+        operators.groupby(["sql_name", "operator"], as_index=False)
+        .agg(
+            occurrences=("timing", "size"),
+            total_timing=("timing", "sum"),
+            avg_timing=("timing", "mean"),
+            total_cardinality=("cardinality", "sum"),
+        )
+        .sort_values("total_timing", ascending=False)
+    )
+    return ranked.head(top).reset_index(drop=True)
+
+
+def main(argv: list[str] = None):
+    """CLI entry point: prints the slowest statements and operators across recorded runs."""
+    parser = argparse.ArgumentParser(description="Rank the slowest DuckDB statements and operators of the pipeline.")
+    parser.add_argument("--db-path", default=DUCKDB_PATH, help="Path to the DuckDB file.")
+    parser.add_argument("--top", type=int, default=10, help="Number of rows per ranking.")
+    args = parser.parse_args(argv)
+
+    with duckdb.connect(args.db_path, read_only=True) as con:
+        statements = slowest_statements(con, args.top)
+        operators = slowest_operators(con, args.top)
+
+    with pd.option_context("display.max_columns", None, "display.width", 200):
+        print(f"Slowest statements (top {args.top}):")
+        print(statements.to_string(index=False))
+        print()
+        print(f"Slowest operators (top {args.top}):")
+        print(operators.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
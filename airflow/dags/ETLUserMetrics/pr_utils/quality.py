@@ -0,0 +1,224 @@
+from datetime import datetime
+
+import duckdb
+import pandas as pd
+
+from ETLUserMetrics.config.pipeline_config import ANONYMIZED_TABLE_NAME, INTERNAL_SQL_DIR
+from ETLUserMetrics.config.quality_config import (
+    QUALITY_CHECKS,
+    DATA_QUALITY_SAMPLE_PERCENT,
+    DATA_QUALITY_TABLE_NAME,
+    DATA_QUALITY_SQL_FILENAME,
+)
+from ETLUserMetrics.pr_utils.utils import get_logger
+from ETLUserMetrics.pr_utils.profiling import execute_query
+
+logger = get_logger(__name__)
+
+# Check types evaluated on the (optionally sampled) partition; all others always see every row
+SAMPLED_CHECK_TYPES = {"null_rate", "allowed_values", "pattern"}
+
+
+class DataQualityError(ValueError):
+    """Raised when an error-severity data-quality check fails for a partition."""
+
+
+def get_check_name(check: dict) -> str:
+    """Returns the explicit check name, or '<type>:<column(s)>' if none is given."""
+    if "name" in check:
+        return check["name"]
+    target = check.get("column") or ",".join(check.get("columns", []))
+    return f"{check['type']}:{target}" if target else check["type"]
+
+
+def compile_check(check: dict, execution_date: str, table_name: str = ANONYMIZED_TABLE_NAME) -> tuple[str, list, float]:
+    """
+    Compiles one declarative check into an aggregate SQL expression.
+
+    Args:
+        check (dict): A check definition from QUALITY_CHECKS.
+        execution_date (str): Partition being checked, in 'YYYY-MM-DD' format.
+        table_name (str): Table holding the loaded data.
+
+    Returns:
+        tuple: (SQL expression producing the metric, bound parameters, threshold).
+
+    Raises:
+        ValueError: If the check type is unknown.
+    """
+    check_type = check["type"]
+    column = check.get("column")
+
+    if check_type == "null_rate":
+        return f"AVG(CASE WHEN {column} IS NULL THEN 1.0 ELSE 0.0 END)", [], check["max_rate"]
+
+    if check_type == "allowed_values":
+        placeholders = ", ".join("?" for _ in check["values"])
+        expression = f"AVG(CASE WHEN {column} IS NULL OR {column} IN ({placeholders}) THEN 0.0 ELSE 1.0 END)"
+        return expression, list(check["values"]), check["max_rate"]
+
+    if check_type == "pattern":
+        expression = f"AVG(CASE WHEN {column} IS NULL OR regexp_matches({column}, ?) THEN 0.0 ELSE 1.0 END)"
+        return expression, [check["pattern"]], check["max_rate"]
+
+    if check_type == "row_count":
+        return "COUNT(*)", [], check["min_rows"]
+
+    if check_type == "row_count_delta":
+        # Relative change vs. the latest earlier partition; NULL (no baseline) passes.
+        # The baseline is the recorded row_count metric, since the init task rebuilds table_name every run.
+        previous_count = f"""(
+            SELECT NULLIF(metric, 0) FROM {DATA_QUALITY_TABLE_NAME}
+            WHERE check_name = ? AND passed AND ingestion_date < ?
+            ORDER BY ingestion_date DESC, checked_at DESC
+            LIMIT 1
+        )"""
+        expression = f"ABS(COUNT(*) - {previous_count}) / {previous_count}"
+        baseline = check.get("baseline_check", "row_count")
+        return expression, [baseline, execution_date, baseline, execution_date], check["max_change"]
+
+    if check_type == "uniqueness":
+        columns = ", ".join(check["columns"])
+        return f"COUNT(DISTINCT ({columns})) / NULLIF(COUNT(*), 0)", [], check["min_ratio"]
+
+    raise ValueError(f"Unknown data-quality check type: {check_type}")
+
+
+def compile_quality_query(
+    checks: list[dict],
+    execution_date: str,
+    table_name: str = ANONYMIZED_TABLE_NAME,
+    sample_percent: float = DATA_QUALITY_SAMPLE_PERCENT,
+) -> tuple[str, list]:
+    """
+    Compiles all checks into a single aggregate query over one ingestion_date partition.
+
+    Rate checks run over a Bernoulli sample when `sample_percent` < 100; row counts
+    and uniqueness always run over the full partition.
+
+    Args:
+        checks (list[dict]): Check definitions.
+        execution_date (str): Partition to check, in 'YYYY-MM-DD' format.
+        table_name (str): Table holding the loaded data.
+        sample_percent (float): Percentage of rows sampled for rate checks.
+
+    Returns:
+        tuple: (SQL returning one row with one column per check, bound parameters).
+    """
+    partition = f"SELECT * FROM {table_name} WHERE ingestion_date = ?"
+    sample = f" USING SAMPLE {float(sample_percent)} PERCENT (bernoulli)" if sample_percent < 100 else ""
+
+    scopes = {"sampled": ([], []), "full": ([], [])}
+    for i, check in enumerate(checks):
+        expression, params, _ = compile_check(check, execution_date, table_name)
+        scope = "sampled" if check["type"] in SAMPLED_CHECK_TYPES else "full"
+        scopes[scope][0].append(f"{expression} AS c{i}")
+        scopes[scope][1].extend(params)
+
+    if scopes["sampled"][0]:
+        # Lets run_quality_checks detect an empty sample and re-run unsampled
+        scopes["sampled"][0].append("COUNT(*) AS sampled_rows")
+
+    subqueries, params = [], []
+    for scope, (expressions, scope_params) in scopes.items():
+        if not expressions:
+            continue
+        suffix = sample if scope == "sampled" else ""
+        # Placeholders in the SELECT list come before the partition filter in the FROM clause
+        subqueries.append(f"(SELECT {', '.join(expressions)} FROM ({partition}) AS p{suffix}) AS {scope}_checks")
+        params.extend(scope_params + [execution_date])
+
+    return f"SELECT * FROM {' CROSS JOIN '.join(subqueries)}", params
+
+
+def run_quality_checks(
+    con: duckdb.DuckDBPyConnection,
+    execution_date: str,
+    checks: list[dict] = QUALITY_CHECKS,
+    table_name: str = ANONYMIZED_TABLE_NAME,
+    sample_percent: float = DATA_QUALITY_SAMPLE_PERCENT,
+) -> pd.DataFrame:
+    """
+    Evaluates all checks against one partition with a single DuckDB query.
+
+    Args:
+        con (duckdb.DuckDBPyConnection): Open connection (may be inside an open transaction).
+        execution_date (str): Partition to check, in 'YYYY-MM-DD' format.
+        checks (list[dict]): Check definitions. Defaults to QUALITY_CHECKS.
+        table_name (str): Table holding the loaded data.
+        sample_percent (float): Percentage of rows sampled for rate checks.
+
+    If the sample is empty (small partition, low sample percent), the checks are
+    re-evaluated on the full partition instead of failing on NULL rates.
+
+    Returns:
+        pd.DataFrame: One row per check with metric, threshold, passed and severity.
+    """
+    # Holds the row_count baselines read by row_count_delta
+    con.execute((INTERNAL_SQL_DIR / DATA_QUALITY_SQL_FILENAME).read_text())
+    sql, params = compile_quality_query(checks, execution_date, table_name, sample_percent)
+    metrics = execute_query(con, sql, params, sql_name="data_quality_checks").iloc[0]
+
+    if sample_percent < 100 and metrics.get("sampled_rows") == 0:
+        logger.info(f"Data-quality sample of {sample_percent}% is empty for {execution_date}, checking all rows.")
+        return run_quality_checks(con, execution_date, checks, table_name, sample_percent=100)
+
+    checked_at = datetime.utcnow()
+    rows = []
+    for i, check in enumerate(checks):
+        _, _, threshold = compile_check(check, execution_date, table_name)
+        metric = metrics[f"c{i}"]
+        metric = None if pd.isna(metric) else float(metric)
+
+        if metric is None:
+            passed = check["type"] == "row_count_delta"  # no earlier partition to compare with
+        elif check["type"] in ("row_count", "uniqueness"):
+            passed = metric >= threshold
+        else:
+            passed = metric <= threshold
+
+        rows.append({
+            "checked_at": checked_at,
+            "ingestion_date": datetime.strptime(execution_date, "%Y-%m-%d").date(),
+            "check_name": get_check_name(check),
+            "severity": check.get("severity", "error"),
+            "metric": metric,
+            "threshold": float(threshold),
+            "passed": passed,
+            "sample_percent": float(sample_percent) if check["type"] in SAMPLED_CHECK_TYPES else 100.0,
+        })
+
+    return pd.DataFrame(rows)
+
+
+def record_quality_results(con: duckdb.DuckDBPyConnection, results: pd.DataFrame):
+    """Appends check results to the data-quality results table."""
+    con.execute((INTERNAL_SQL_DIR / DATA_QUALITY_SQL_FILENAME).read_text())
+    con.register("quality_results", results)
+    con.execute(f"INSERT INTO {DATA_QUALITY_TABLE_NAME} SELECT * FROM quality_results")
+    con.unregister("quality_results")
+
+
+def get_blocking_failures(results: pd.DataFrame) -> list[str]:
+    """Returns the names of failed checks with severity 'error'."""
+    return results[~results["passed"] & (results["severity"] == "error")]["check_name"].tolist()
+
+
+def enforce_quality(results: pd.DataFrame):
+    """
+    Logs check results and raises if any error-severity check failed.
+
+    Raises:
+        DataQualityError: If at least one check with severity 'error' failed.
+    """
+    for row in results.itertuples():
+        status = "PASS" if row.passed else "FAIL"
+        logger.info(f"[DQ {status}] {row.check_name}: metric={row.metric} threshold={row.threshold} ({row.severity})")
+
+    warnings = results[~results["passed"] & (results["severity"] == "warn")]["check_name"].tolist()
+    if warnings:
+        logger.warning(f"Data-quality warnings: {warnings}")
+
+    errors = get_blocking_failures(results)
+    if errors:
+        raise DataQualityError(f"Data-quality checks failed: {errors}")
@@ -0,0 +1,206 @@
+import math
+from datetime import datetime
+
+import duckdb
+import numpy as np
+
+from ETLUserMetrics.config.pipeline_config import (
+    ANONYMIZED_TABLE_NAME,
+    INTERNAL_SQL_DIR,
+    HLL_ERROR_BOUND,
+    HLL_COLUMN_SETS,
+    HLL_SKETCHES_TABLE_NAME,
+    HLL_SKETCHES_SQL_FILENAME,
+)
+from ETLUserMetrics.pr_utils.utils import get_logger
+from ETLUserMetrics.pr_utils.profiling import execute_query
+
+logger = get_logger(__name__)
+
+MIN_PRECISION = 4
+MAX_PRECISION = 18
+
+
+def get_precision(error_bound: float = HLL_ERROR_BOUND) -> int:
+    """
+    Returns the HyperLogLog precision p (2^p registers) for a relative standard error.
+
+    The standard error of HyperLogLog is 1.04 / sqrt(2^p).
+
+    Args:
+        error_bound (float): Target relative standard error, e.g. 0.01 for 1%.
+
+    Returns:
+        int: Precision, clamped to [MIN_PRECISION, MAX_PRECISION].
+    """
+    precision = math.ceil(math.log2((1.04 / error_bound) ** 2))
+    return max(MIN_PRECISION, min(MAX_PRECISION, precision))
+
+
+def build_sketch(
+    con: duckdb.DuckDBPyConnection,
+    columns: list[str],
+    execution_date: str,
+    precision: int,
+    table_name: str = ANONYMIZED_TABLE_NAME,
+) -> np.ndarray:
+    """
+    Builds the HyperLogLog registers for one ingestion_date partition inside DuckDB.
+
+    Each row is hashed over `columns`; the top `precision` bits pick the register and
+    the position of the leftmost 1-bit in the remaining bits is the register value.
+    Only 2^precision (index, max) pairs leave DuckDB.
+
+    Args:
+        con (duckdb.DuckDBPyConnection): Open connection to the pipeline database.
+        columns (list[str]): Columns whose combined distinct count is tracked.
+        execution_date (str): Partition to sketch, in 'YYYY-MM-DD' format.
+        precision (int): HyperLogLog precision p.
+        table_name (str): Table holding the loaded data.
+
+    Returns:
+        np.ndarray: uint8 array of 2^precision registers.
+    """
+    width = 64 - precision
+    # floor(log2()) on a DOUBLE can round up just below a power of two; the CASE corrects it
+    sql = f"""
+        WITH hashed AS (
+            SELECT h >> {width} AS idx, h & ((1::UBIGINT << {width}) - 1) AS w
+            FROM (SELECT hash({", ".join(columns)}) AS h FROM {table_name} WHERE ingestion_date = ?)
+        ), ranked AS (
+            SELECT idx, w, floor(log2(w::DOUBLE))::INTEGER AS r
+            FROM hashed
+            WHERE w > 0
+        )
+        SELECT idx, MAX(rho)::UTINYINT AS rho FROM (
+            SELECT idx, {width} - (CASE WHEN (1::UBIGINT << r) > w THEN r - 1 ELSE r END) AS rho FROM ranked
+            UNION ALL
+            SELECT idx, {width + 1} AS rho FROM hashed WHERE w = 0
+        )
+        GROUP BY idx
+    """
+    pairs = execute_query(con, sql, (execution_date,), sql_name="build_hll_sketch")
+
+    registers = np.zeros(2 ** precision, dtype=np.uint8)
+    registers[pairs["idx"].to_numpy(dtype=np.int64)] = pairs["rho"].to_numpy(dtype=np.uint8)
+    return registers
+
+
+def estimate_cardinality(registers: np.ndarray) -> float:
+    """
+    Estimates the number of distinct values from HyperLogLog registers.
+
+    Uses linear counting for small cardinalities, as in the original HyperLogLog paper.
+
+    Args:
+        registers (np.ndarray): uint8 registers (possibly merged from several sketches).
+
+    Returns:
+        float: Estimated distinct count.
+    """
+    m = len(registers)
+    alpha = {16: 0.673, 32: 0.697, 64: 0.709}.get(m, 0.7213 / (1 + 1.079 / m))
+    raw = alpha * m * m / np.sum(np.power(2.0, -registers.astype(np.float64)))
+
+    zeros = int(np.count_nonzero(registers == 0))
+    if raw <= 2.5 * m and zeros > 0:
+        return m * math.log(m / zeros)
+    return raw
+
+
+def refresh_sketches(
+    con: duckdb.DuckDBPyConnection,
+    execution_date: str,
+    column_sets: dict = HLL_COLUMN_SETS,
+    error_bound: float = HLL_ERROR_BOUND,
+    table_name: str = ANONYMIZED_TABLE_NAME,
+):
+    """
+    Rebuilds and stores one sketch per tracked column set for an ingestion_date.
+
+    Args:
+        con (duckdb.DuckDBPyConnection): Open connection to the pipeline database.
+        execution_date (str): Partition to sketch, in 'YYYY-MM-DD' format.
+        column_sets (dict): Mapping of column set name to columns. Defaults to HLL_COLUMN_SETS.
+        error_bound (float): Target relative standard error.
+        table_name (str): Table holding the loaded data.
+    """
+    precision = get_precision(error_bound)
+    con.execute((INTERNAL_SQL_DIR / HLL_SKETCHES_SQL_FILENAME).read_text())
+
+    for name, columns in column_sets.items():
+        registers = build_sketch(con, columns, execution_date, precision, table_name)
+        con.execute(
+            f"DELETE FROM {HLL_SKETCHES_TABLE_NAME} WHERE ingestion_date = ? AND column_set = ?",
+            (execution_date, name)
+        )
+        con.execute(
+            f"INSERT INTO {HLL_SKETCHES_TABLE_NAME} VALUES (?, ?, ?, ?, ?)",
+            (execution_date, name, precision, registers.tobytes(), datetime.utcnow())
+        )
+
+    logger.info(f"Stored HyperLogLog sketches (p={precision}) for {execution_date}: {list(column_sets)}")
+
+
+def approx_distinct_count(
+    con: duckdb.DuckDBPyConnection,
+    column_set: str,
+    start_date: str = None,
+    end_date: str = None,
+) -> int:
+    """
+    Estimates a distinct count over a date range by merging the stored daily sketches.
+
+    Args:
+        con (duckdb.DuckDBPyConnection): Open connection to the pipeline database.
+        column_set (str): Name of a tracked column set (see HLL_COLUMN_SETS).
+        start_date (str, optional): First ingestion_date included. Unbounded if None.
+        end_date (str, optional): Last ingestion_date included. Unbounded if None.
+
+    Returns:
+        int: Estimated distinct count (0 if no sketch matches).
+
+    Raises:
+        ValueError: If the matching sketches were built with different precisions.
+    """
+    con.execute((INTERNAL_SQL_DIR / HLL_SKETCHES_SQL_FILENAME).read_text())
+    sketches = con.execute(
+        f"""
+        SELECT precision, registers FROM {HLL_SKETCHES_TABLE_NAME}
+        WHERE column_set = ?
+          AND (?::DATE IS NULL OR ingestion_date >= ?::DATE)
+          AND (?::DATE IS NULL OR ingestion_date <= ?::DATE)
+        """,
+        (column_set, start_date, start_date, end_date, end_date)
+    ).fetchall()
+    if not sketches:
+        return 0
+
+    precisions = {precision for precision, _ in sketches}
+    if len(precisions) > 1:
+        raise ValueError(f"Cannot merge sketches with different precisions: {sorted(precisions)}")
+
+    merged = np.maximum.reduce([np.frombuffer(registers, dtype=np.uint8) for _, registers in sketches])
+    return round(estimate_cardinality(merged))
+
+
+def exact_distinct_count(
+    con: duckdb.DuckDBPyConnection,
+    columns: list[str],
+    start_date: str = None,
+    end_date: str = None,
+    table_name: str = ANONYMIZED_TABLE_NAME,
+) -> int:
+    """Exact distinct count over `columns` for a date range, for audits against the sketches."""
+    return execute_query(
+        con,
+        f"""
+        SELECT COUNT(*) FROM (
+            SELECT DISTINCT {", ".join(columns)} FROM {table_name}
+            WHERE (?::DATE IS NULL OR ingestion_date >= ?::DATE)
+              AND (?::DATE IS NULL OR ingestion_date <= ?::DATE)
+        )
+        """,
+        (start_date, start_date, end_date, end_date),
+        sql_name="exact_distinct_count",
+    ).iloc[0, 0]
@@ -11,14 +11,21 @@ from ETLUserMetrics.config.pipeline_config import (
     ANONYMIZED_TABLE_NAME,
     METADATA_TABLE_NAME,
     METADATA_UNIQUE_COLUMNS,
+    DISTINCT_COUNT_MODE,
 )
 from ETLUserMetrics.pr_utils.utils import get_logger
+from ETLUserMetrics.pr_utils.profiling import execute_query
+from ETLUserMetrics.pr_utils.sketches import refresh_sketches, approx_distinct_count
 
 logger = get_logger(__name__)
 
-# Load SQL initialization script for DuckDB tables
+# SQL initialization script for DuckDB tables
 SQL_FILE_PATH = Path(__file__).parents[1] / "sql" / "internal" / "init_internal_tables.sql"
-init_internal_tables = SQL_FILE_PATH.read_text()
+
+
+def load_init_internal_tables_sql() -> str:
+    """Reads the DuckDB table initialization script (on demand, not at import time)."""
+    return SQL_FILE_PATH.read_text()
 
 
 def save_parquet(df: pd.DataFrame, base_path: str, execution_date: str = None) -> Path:
@@ -60,7 +67,12 @@ def save_parquet(df: pd.DataFrame, base_path: str, execution_date: str = None) -
     return output_path
 
 
-def insert_into_duckdb(df: pd.DataFrame, execution_date: str, db_path: str = DUCKDB_PATH):
+def insert_into_duckdb(
+    df: pd.DataFrame,
+    execution_date: str,
+    db_path: str = DUCKDB_PATH,
+    distinct_count_mode: str = DISTINCT_COUNT_MODE,
+):
     """
     Inserts anonymized data into DuckDB.
 
@@ -68,35 +80,44 @@ def insert_into_duckdb(df: pd.DataFrame, execution_date: str, db_path: str = DUC
     - Adds 'ingestion_date' column to the data.
     - Inserts data into the anonymized user table.
     - Logs row counts and unique value counts for validation.
+      In 'approx' mode the unique count is merged from the daily HyperLogLog sketches;
+      'exact' runs a full SELECT DISTINCT (for audits).
 
     Args:
         df (pd.DataFrame): Anonymized user data.
         execution_date (str): Ingestion date string in 'YYYY-MM-DD' format.
         db_path (str): Path to the DuckDB file.
+        distinct_count_mode (str): 'approx' or 'exact'. Defaults to DISTINCT_COUNT_MODE.
     """
     with duckdb.connect(db_path) as con:
-        con.execute(init_internal_tables)
+        execute_query(con, load_init_internal_tables_sql(), sql_name=SQL_FILE_PATH.name)
 
         df["ingestion_date"] = datetime.strptime(execution_date, "%Y-%m-%d").date()
         con.register("df", df)
 
         insert_sql = f"INSERT INTO {ANONYMIZED_TABLE_NAME} SELECT * FROM df"
-        con.execute(insert_sql)
+        execute_query(con, insert_sql, sql_name="insert_into_duckdb")
 
-        total_count = con.execute(f"SELECT COUNT(*) FROM {ANONYMIZED_TABLE_NAME}").fetchone()[0]
+        total_count = execute_query(
+            con, f"SELECT COUNT(*) FROM {ANONYMIZED_TABLE_NAME}", sql_name="total_count"
+        ).iloc[0, 0]
 
         distinct_cols = ", ".join(METADATA_UNIQUE_COLUMNS)
-        unique_sql = f"""
-            SELECT COUNT(*) FROM (
-                SELECT DISTINCT {distinct_cols}
-                FROM {ANONYMIZED_TABLE_NAME}
-            )
-        """
-        unique_count = con.execute(unique_sql).fetchone()[0]
+        if distinct_count_mode == "approx":
+            refresh_sketches(con, execution_date)
+            unique_count = approx_distinct_count(con, "metadata_unique")
+        else:
+            unique_sql = f"""
+                SELECT COUNT(*) FROM (
+                    SELECT DISTINCT {distinct_cols}
+                    FROM {ANONYMIZED_TABLE_NAME}
+                )
+            """
+            unique_count = execute_query(con, unique_sql, sql_name="unique_count").iloc[0, 0]
 
     logger.info(f"Inserted {len(df)} records into DuckDB.")
     logger.info(f"Total records in '{ANONYMIZED_TABLE_NAME}': {total_count}")
-    logger.info(f"Unique records (by {distinct_cols}): {unique_count}")
+    logger.info(f"Unique records (by {distinct_cols}, {distinct_count_mode}): {unique_count}")
 
 
 def compute_schema_signature(df: pd.DataFrame) -> str:
@@ -137,7 +158,8 @@ def log_metadata(df: pd.DataFrame, parquet_path: Path, db_path: str = DUCKDB_PAT
     schema_signature = compute_schema_signature(df)
 
     with duckdb.connect(db_path) as con:
-        con.execute(
+        execute_query(
+            con,
             f"""
             INSERT INTO {METADATA_TABLE_NAME} (
                 ingestion_time, records_inserted, filepath,
@@ -151,7 +173,8 @@ def log_metadata(df: pd.DataFrame, parquet_path: Path, db_path: str = DUCKDB_PAT
                 len(columns),
                 json.dumps(columns),
                 schema_signature
-            )
+            ),
+            sql_name="log_metadata",
         )
     logger.info(f"Metadata logged: {len(df)} rows, {len(columns)} columns.")
 
@@ -169,9 +192,9 @@ def cleanup_metadata_log(days: int = 30, db_path: str = DUCKDB_PATH):
     cutoff = datetime.utcnow() - timedelta(days=days)
 
     with duckdb.connect(db_path) as con:
-        con.execute(f"""
+        execute_query(con, f"""
             DELETE FROM {METADATA_TABLE_NAME}
             WHERE ingestion_time < ?
-        """, (cutoff,))
+        """, (cutoff,), sql_name="cleanup_metadata_log")
 
     logger.info(f"Cleaned metadata entries older than {cutoff}")
@@ -1,4 +1,6 @@
+import numpy as np
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 import duckdb
@@ -11,9 +13,32 @@ from ETLUserMetrics.config.pipeline_config import (
     ANONYMIZED_TABLE_NAME,
     INTERNAL_SQL_DIR,
     UNIQUE_SQL_FILENAME,
+    DISTINCT_COUNT_MODE,
+    STAGE_CACHE_ENABLED,
 )
 from ETLUserMetrics.pr_utils.utils import run_sql_query
 from ETLUserMetrics.pr_utils.utils import get_logger
+from ETLUserMetrics.pr_utils.storage import save_parquet, log_metadata
+from ETLUserMetrics.pr_utils.memory import compact_dataframe, log_memory_footprint, map_categories
+from ETLUserMetrics.pr_utils.parallel import map_dataframe
+from ETLUserMetrics.pr_utils.quality import (
+    run_quality_checks,
+    record_quality_results,
+    get_blocking_failures,
+    enforce_quality,
+)
+from ETLUserMetrics.pr_utils.sketches import refresh_sketches, approx_distinct_count
+from ETLUserMetrics.config.quality_config import DATA_QUALITY_ENABLED
+from ETLUserMetrics.pr_utils.profiling import deferred_profiles, execute_query
+from ETLUserMetrics.pr_utils.cache import (
+    compute_fingerprint,
+    dataframe_sha256,
+    file_sha256,
+    get_code_version,
+    get_config_fingerprint,
+    is_stage_cached,
+    record_stage_run,
+)
 
 logger = get_logger(__name__)
 
@@ -44,47 +69,154 @@ def extract_email_domain(email):
         return "unknown"
 
 
-def transform_user_data(df: pd.DataFrame, execution_date: str) -> pd.DataFrame:
-    df = df.copy()
+def derive_user_columns(df: pd.DataFrame) -> pd.DataFrame:
+    # Row-level rules only: runs on independent chunks in parallel (see pr_utils.parallel)
     if "birthday" in df.columns:
-        df["age_group"] = df["birthday"].apply(calculate_age_group)
+        df["age_group"] = map_categories(df["birthday"], calculate_age_group)
     else:
         df["age_group"] = "unknown"
-    df["email"] = df["email"].apply(extract_email_domain)
+    df["email"] = map_categories(df["email"], extract_email_domain)
+    return df
+
+
+def transform_user_data(df: pd.DataFrame, execution_date: str, workers: int = None) -> pd.DataFrame:
+    # Only copy the columns the output needs (masked columns are left behind)
+    df = df[[col for col in df.columns if col in FINAL_USER_COLUMNS or col == "birthday"]].copy()
+    df = map_dataframe(df, derive_user_columns, workers)
     df["ingestion_date"] = execution_date
-    df["faker_id"] = range(1, len(df) + 1)
+    df["faker_id"] = np.arange(1, len(df) + 1)
 
-    df = df[FINAL_USER_COLUMNS]
+    df = compact_dataframe(df[FINAL_USER_COLUMNS].copy())
     logger.info(f"Transformed DataFrame with shape: {df.shape}")
+    log_memory_footprint(df, "transform")
     return df
 
 
-def insert_transformed_data(df: pd.DataFrame, execution_date: str, table_name: str = ANONYMIZED_TABLE_NAME):
+def insert_transformed_data(
+    df: pd.DataFrame,
+    execution_date: str,
+    table_name: str = ANONYMIZED_TABLE_NAME,
+    check_quality: bool = DATA_QUALITY_ENABLED,
+    distinct_count_mode: str = DISTINCT_COUNT_MODE,
+    force: bool = False,
+    use_cache: bool = STAGE_CACHE_ENABLED,
+):
+    results = None
+    fingerprint = None
+    if use_cache:
+        fingerprint = compute_fingerprint({
+            "data": dataframe_sha256(df),
+            "table": table_name,
+            "check_quality": check_quality,
+            "distinct_count_mode": distinct_count_mode,
+            "config": get_config_fingerprint(),
+            "code": get_code_version(),
+        })
+
     with duckdb.connect(DUCKDB_PATH) as con:
-        con.register("df", df)
-        
-        # Assuming ingestion_date is a standard
-        con.execute(f"DELETE FROM {table_name} WHERE ingestion_date = ?", (execution_date,))
-        con.execute(f"INSERT INTO {table_name} SELECT * FROM df")
+        if fingerprint and not force and is_stage_cached(con, "insert", execution_date, fingerprint, table_name):
+            logger.info(f"Partition {execution_date} of '{table_name}' is up to date, skipping insert.")
+            return
 
-        total = con.execute(f"SELECT COUNT(*) FROM {table_name}").fetchone()[0]
+        con.register("df", df)
 
-    unique_df = run_sql_query(UNIQUE_SQL_FILENAME, sql_dir=INTERNAL_SQL_DIR)
-    unique = unique_df["unique_count"].iloc[0]
+        # Profiles of the transaction's statements are written after it ends, so they survive a rollback
+        with deferred_profiles(con):
+            # Replace the partition in one transaction, so failed quality checks leave the table untouched
+            con.execute("BEGIN TRANSACTION")
+            # Assuming ingestion_date is a standard
+            execute_query(
+                con, f"DELETE FROM {table_name} WHERE ingestion_date = ?", (execution_date,),
+                sql_name="delete_partition",
+            )
+            execute_query(con, f"INSERT INTO {table_name} SELECT * FROM df", sql_name="insert_transformed_data")
+
+            if check_quality:
+                results = run_quality_checks(con, execution_date, table_name=table_name)
+            blocked = results is not None and bool(get_blocking_failures(results))
+
+            if not blocked:
+                # Daily sketches are committed together with the partition they describe
+                refresh_sketches(con, execution_date, table_name=table_name)
+                if fingerprint:
+                    record_stage_run(con, "insert", execution_date, fingerprint, len(df))
+            con.execute("ROLLBACK" if blocked else "COMMIT")
+
+        if results is not None:
+            record_quality_results(con, results)
+            # A blocked load stops here, before any reads of what it would have written
+            enforce_quality(results)
+
+        total = execute_query(con, f"SELECT COUNT(*) FROM {table_name}", sql_name="total_count").iloc[0, 0]
+        if distinct_count_mode == "approx":
+            unique = approx_distinct_count(con, "metadata_unique")
+
+    if distinct_count_mode != "approx":
+        unique_df = run_sql_query(UNIQUE_SQL_FILENAME, sql_dir=INTERNAL_SQL_DIR)
+        unique = unique_df["unique_count"].iloc[0]
 
     logger.info(f"Inserted {len(df)} records into '{table_name}'.")
-    logger.info(f"Total in DuckDB: {total} | Unique email providers: {unique}")
+    logger.info(f"Total in DuckDB: {total} | Unique email providers ({distinct_count_mode}): {unique}")
 
 
-def run_transformation_pipeline(execution_date: str):
+def run_transformation_pipeline(execution_date: str, force: bool = False, use_cache: bool = STAGE_CACHE_ENABLED):
     parquet_path = get_expected_parquet_path(execution_date)
     if not parquet_path.exists():
         raise FileNotFoundError(f"Parquet file not found: {parquet_path}")
 
+    fingerprint = None
+    if use_cache:
+        # Same input file, same output-relevant config and same code -> same partition
+        fingerprint = compute_fingerprint({
+            "parquet": file_sha256(parquet_path),
+            "config": get_config_fingerprint(),
+            "code": get_code_version(),
+        })
+        with duckdb.connect(DUCKDB_PATH) as con:
+            cached = not force and is_stage_cached(con, "transform", execution_date, fingerprint)
+        if cached:
+            logger.info(f"Inputs for {execution_date} unchanged since last successful run, skipping transform.")
+            return
+
     df = pd.read_parquet(parquet_path)
     logger.info(f"Loaded {len(df)} records from {parquet_path}")
+    log_memory_footprint(df, "load_parquet")
 
     transformed = transform_user_data(df, execution_date)
     logger.info(f"Transformed preview:\n{transformed.head()}")
 
-    insert_transformed_data(transformed, execution_date)
+    insert_transformed_data(transformed, execution_date, force=force, use_cache=use_cache)
+
+    if fingerprint:
+        with duckdb.connect(DUCKDB_PATH) as con:
+            record_stage_run(con, "transform", execution_date, fingerprint, len(transformed))
+
+
+def run_fused_pipeline(df: pd.DataFrame, execution_date: str, raw_path: str = RAW_PATH, force: bool = False):
+    """
+    Transforms and loads anonymized data in memory, skipping the Parquet round trip.
+
+    - The raw Parquet file is written on a background thread, for lineage and the
+      data lake only; it is never read back.
+    - Meanwhile the in-memory DataFrame is transformed and inserted into DuckDB.
+      The transform runs in-process: forking a process pool while the writer thread
+      holds pyarrow locks could deadlock the workers.
+    - Metadata is logged once both have finished.
+
+    Args:
+        df (pd.DataFrame): Anonymized user data (output of `anonymize_users`).
+        execution_date (str): Ingestion date string in 'YYYY-MM-DD' format.
+        raw_path (str): Root directory of the raw data lake.
+        force (bool): Re-insert even if the partition already holds identical data.
+    """
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        # transform_user_data works on a copy, so the writer thread only ever reads `df`
+        parquet_future = executor.submit(save_parquet, df, raw_path, execution_date)
+
+        transformed = transform_user_data(df, execution_date, workers=1)
+        logger.info(f"Transformed preview:\n{transformed.head()}")
+        insert_transformed_data(transformed, execution_date, force=force)
+
+        parquet_path = parquet_future.result()
+
+    log_metadata(df, parquet_path)
@@ -5,6 +5,7 @@ import logging
 import sys
 
 from ETLUserMetrics.config.pipeline_config import DUCKDB_PATH
+from ETLUserMetrics.pr_utils.profiling import execute_query
 
 # Default path for SQL files used in reporting
 DEFAULT_SQL_DIR = Path(__file__).parents[2] / "sql" / "reporting"
@@ -15,7 +16,7 @@ def run_sql_query(sql_filename: str, sql_dir: Path = DEFAULT_SQL_DIR):
     Executes a SQL query from a file using DuckDB and returns the result as a DataFrame.
 
     - Looks for a SQL file in the provided `sql_dir`.
-    - Executes the query using DuckDB.
+    - Executes the query using DuckDB (profiled into `query_profiles` when enabled).
     - Prints and returns the result as a pandas DataFrame.
 
     Args:
@@ -39,7 +40,7 @@ def run_sql_query(sql_filename: str, sql_dir: Path = DEFAULT_SQL_DIR):
     query = path.read_text()
 
     with duckdb.connect(DUCKDB_PATH) as con:
-        result = con.execute(query).fetchdf()
+        result = execute_query(con, query, sql_name=sql_filename)
         print(f"Query {sql_filename} executed successfully from {sql_dir}.")
         print(result.head())
         return result
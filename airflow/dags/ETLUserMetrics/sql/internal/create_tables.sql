@@ -1,2 +1,2 @@
-SELECT COUNT(*) FROM persons_anonymized
-WHERE ingestion_date = '{ingestion_date}';
\ No newline at end of file
+SELECT COUNT(*) AS row_count FROM persons_anonymized
+WHERE ingestion_date = $ingestion_date;
\ No newline at end of file
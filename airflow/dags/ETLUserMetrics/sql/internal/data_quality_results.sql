@@ -0,0 +1,10 @@
+CREATE TABLE IF NOT EXISTS data_quality_results (
+    checked_at TIMESTAMP,
+    ingestion_date DATE,
+    check_name VARCHAR,
+    severity VARCHAR,
+    metric DOUBLE,
+    threshold DOUBLE,
+    passed BOOLEAN,
+    sample_percent DOUBLE
+);
@@ -0,0 +1,7 @@
+CREATE TABLE IF NOT EXISTS hll_sketches (
+    ingestion_date DATE,
+    column_set VARCHAR,
+    precision INTEGER,
+    registers BLOB,
+    created_at TIMESTAMP
+);
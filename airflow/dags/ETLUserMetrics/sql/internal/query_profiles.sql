@@ -0,0 +1,12 @@
+CREATE TABLE IF NOT EXISTS query_profiles (
+    profiled_at TIMESTAMP,
+    task_id VARCHAR,
+    sql_name VARCHAR,
+    query_text VARCHAR,
+    latency_seconds DOUBLE,
+    rows_returned BIGINT,
+    rows_scanned BIGINT,
+    peak_memory_bytes BIGINT,
+    operator_timings VARCHAR,
+    query_plan VARCHAR
+);
@@ -0,0 +1,7 @@
+CREATE TABLE IF NOT EXISTS stage_fingerprints (
+    stage VARCHAR,
+    execution_date DATE,
+    fingerprint VARCHAR,
+    row_count BIGINT,
+    completed_at TIMESTAMP
+);
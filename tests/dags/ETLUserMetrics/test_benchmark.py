@@ -0,0 +1,73 @@
+import sys, os
+sys.path.insert(0, os.path.abspath("airflow/dags"))
+
+from ETLUserMetrics.pr_utils.anonymize import anonymize_users
+import multiprocessing
+import time
+import pytest
+from ETLUserMetrics.pr_utils.benchmark import StageTimer, current_rss_mb, format_report, generate_synthetic_users
+
+
+def test_synthetic_users_match_pipeline_shape():
+    users = generate_synthetic_users(10, seed=1)
+
+    assert len(users) == 10
+    assert users == generate_synthetic_users(10, seed=1)
+
+    df = anonymize_users(users)
+    assert {"email", "birthday", "gender", "city", "country", "country_code"} <= set(df.columns)
+    assert df["street"].eq("****").all()
+
+
+def test_format_report_lists_every_stage():
+    report = {
+        "persons": 100,
+        "stages": [{"stage": "fetch", "seconds": 0.1, "rows": 100, "rows_per_second": 1000, "peak_memory_mb": 50.0}],
+        "total_seconds": 0.1,
+        "peak_rss_mb": 50.0,
+        "children_peak_rss_mb": 20.0,
+        "parquet_size_mb": 0.01,
+        "duckdb_size_mb": 0.5,
+        "reporting_latency_seconds": {"top_gmail_countries": 0.01},
+    }
+
+    text = format_report([report])
+
+    assert "100 persons" in text
+    assert "fetch" in text
+    assert "top_gmail_countries" in text
+
+
+@pytest.mark.skipif(current_rss_mb() is None, reason="needs /proc/self/statm")
+def test_stage_peak_memory_is_measured_per_stage():
+    timer = StageTimer()
+
+    # A large allocation freed at the end of the first stage must not inflate the second
+    timer.run("allocate", 0, lambda: len(bytearray(200 * 1024 * 1024)))
+    timer.run("idle", 0, lambda: None)
+
+    allocate, idle = timer.stages
+    assert allocate["peak_memory_mb"] - idle["peak_memory_mb"] > 100
+
+
+def _allocate_and_hold():
+    payload = b"x" * (200 * 1024 * 1024)
+    time.sleep(0.5)
+    return len(payload)
+
+
+def _run_in_forked_worker():
+    process = multiprocessing.get_context("fork").Process(target=_allocate_and_hold)
+    process.start()
+    process.join()
+
+
+@pytest.mark.skipif(current_rss_mb() is None, reason="needs /proc/self/statm")
+def test_stage_peak_memory_includes_forked_workers():
+    timer = StageTimer()
+
+    timer.run("workers", 0, _run_in_forked_worker)
+    timer.run("idle", 0, lambda: None)
+
+    workers, idle = timer.stages
+    assert workers["peak_memory_mb"] - idle["peak_memory_mb"] > 100
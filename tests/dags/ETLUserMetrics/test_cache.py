@@ -0,0 +1,55 @@
+import sys, os
+sys.path.insert(0, os.path.abspath("airflow/dags"))
+
+import duckdb
+import pandas as pd
+import pytest
+from ETLUserMetrics.pr_utils import cache
+from ETLUserMetrics.pr_utils.cache import (
+    STAGE_CODE_FILES,
+    compute_fingerprint,
+    dataframe_sha256,
+    is_stage_cached,
+    record_stage_run,
+)
+
+
+@pytest.fixture
+def con():
+    with duckdb.connect() as con:
+        con.execute("""
+            CREATE TABLE persons_anonymized AS
+            SELECT range AS faker_id, DATE '2024-01-01' AS ingestion_date FROM range(100)
+        """)
+        yield con
+
+
+def test_fingerprint_is_stable_and_content_sensitive():
+    df = pd.DataFrame({"email": ["gmail.com", "web.de"], "age_group": ["[20-30]", "[30-40]"]})
+
+    assert dataframe_sha256(df) == dataframe_sha256(df.copy())
+    assert dataframe_sha256(df) != dataframe_sha256(df.assign(email=["gmail.com", "gmx.net"]))
+    assert compute_fingerprint({"a": 1, "b": 2}) == compute_fingerprint({"b": 2, "a": 1})
+
+
+def test_fingerprint_covers_quality_and_sketch_config(monkeypatch):
+    before = compute_fingerprint(cache.get_config_fingerprint())
+    monkeypatch.setattr(cache, "HLL_COLUMN_SETS", {"email_provider": ["email", "country"]})
+    assert compute_fingerprint(cache.get_config_fingerprint()) != before
+
+    code_files = {path.name for path in STAGE_CODE_FILES}
+    assert {"quality.py", "sketches.py", "storage.py", "quality_config.py", "init_internal_tables.sql"} <= code_files
+
+
+def test_stage_cache_hit_and_invalidation(con):
+    fingerprint = compute_fingerprint({"data": "abc"})
+    assert not is_stage_cached(con, "insert", "2024-01-01", fingerprint)
+
+    record_stage_run(con, "insert", "2024-01-01", fingerprint, 100)
+    assert is_stage_cached(con, "insert", "2024-01-01", fingerprint)
+    assert not is_stage_cached(con, "insert", "2024-01-01", compute_fingerprint({"data": "abd"}))
+    assert not is_stage_cached(con, "insert", "2024-01-02", fingerprint)
+
+    # The partition changed behind the cache's back
+    con.execute("DELETE FROM persons_anonymized WHERE faker_id < 10")
+    assert not is_stage_cached(con, "insert", "2024-01-01", fingerprint)
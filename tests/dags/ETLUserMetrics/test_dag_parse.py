@@ -0,0 +1,44 @@
+import sys, os
+sys.path.insert(0, os.path.abspath("airflow/dags"))
+
+import json
+import subprocess
+
+import pytest
+
+pytest.importorskip("airflow.models")
+
+DAG_FILE = os.path.abspath("airflow/dags/ETLUserMetrics/etl_user_metrics_dag.py")
+
+# Parse-time budgets for the DAG file, measured after airflow itself is imported
+PARSE_TIME_BUDGET_SECONDS = 1.0
+FORBIDDEN_PARSE_TIME_MODULES = ["pandas", "duckdb", "requests", "pyarrow"]
+
+PARSE_SCRIPT = """
+import importlib.util, json, sys, time
+sys.path.insert(0, {dags_dir!r})
+import airflow, airflow.models, airflow.operators.python
+before = set(sys.modules)
+start = time.perf_counter()
+spec = importlib.util.spec_from_file_location("etl_user_metrics_dag", {dag_file!r})
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+print(json.dumps({{"seconds": time.perf_counter() - start, "modules": sorted(set(sys.modules) - before)}}))
+"""
+
+
+def parse_dag_file():
+    script = PARSE_SCRIPT.format(dags_dir=os.path.abspath("airflow/dags"), dag_file=DAG_FILE)
+    output = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def test_dag_parse_does_not_import_heavy_modules():
+    modules = set(parse_dag_file()["modules"])
+
+    for name in FORBIDDEN_PARSE_TIME_MODULES:
+        assert name not in modules, f"{name} is imported by the DAG file at parse time"
+
+
+def test_dag_parse_time_budget():
+    assert parse_dag_file()["seconds"] < PARSE_TIME_BUDGET_SECONDS
@@ -0,0 +1,80 @@
+import sys, os
+sys.path.insert(0, os.path.abspath("airflow/dags"))
+
+import pytest
+
+pytest.importorskip("airflow.models")
+
+from unittest.mock import MagicMock
+import duckdb
+import pandas as pd
+from ETLUserMetrics.pr_utils.operators.duckdb_operator import DuckDBExecuteQueryOperator
+
+
+def test_operator_binds_parameters_and_writes_parquet(tmp_path):
+    db_path = str(tmp_path / "test.duckdb")
+    with duckdb.connect(db_path) as con:
+        con.execute("CREATE TABLE persons_anonymized (ingestion_date DATE)")
+        con.execute("INSERT INTO persons_anonymized VALUES ('2024-01-01'), ('2024-01-01'), ('2024-01-02')")
+
+    sql_file = tmp_path / "count.sql"
+    sql_file.write_text("SELECT COUNT(*) AS row_count FROM persons_anonymized WHERE ingestion_date = $ingestion_date;")
+    output_path = tmp_path / "out" / "count.parquet"
+
+    operator = DuckDBExecuteQueryOperator(
+        task_id="count",
+        sql_path=str(sql_file),
+        parameters={"ingestion_date": "2024-01-01"},
+        db_path=db_path,
+        threads=1,
+        memory_limit="256MB",
+        output_path=str(output_path),
+    )
+    result = operator.execute({"ti": MagicMock()})
+
+    assert result == str(output_path)
+    assert pd.read_parquet(output_path)["row_count"].iloc[0] == 2
+
+
+def test_operator_streams_arrow_output(tmp_path):
+    import pyarrow.ipc as ipc
+
+    sql_file = tmp_path / "range.sql"
+    sql_file.write_text("SELECT range AS i FROM range(5000);")
+    output_path = tmp_path / "range.arrow"
+
+    operator = DuckDBExecuteQueryOperator(
+        task_id="range",
+        sql_path=str(sql_file),
+        db_path=str(tmp_path / "test.duckdb"),
+        output_path=str(output_path),
+        output_format="arrow",
+    )
+    result = operator.execute({"ti": MagicMock()})
+
+    assert result == str(output_path)
+    assert ipc.open_file(output_path).read_all()["i"].to_pylist() == list(range(5000))
+
+
+def test_operator_pushes_profile_path_only_when_written(tmp_path):
+    query_file = tmp_path / "query.sql"
+    query_file.write_text("SELECT range % 3 AS g, COUNT(*) AS n FROM range(1000) GROUP BY g;")
+    ddl_file = tmp_path / "ddl.sql"
+    ddl_file.write_text("CREATE TABLE IF NOT EXISTS t (i INTEGER); DROP TABLE IF EXISTS t;")
+
+    for sql_file, expect_profile in ((query_file, True), (ddl_file, False)):
+        ti = MagicMock()
+        operator = DuckDBExecuteQueryOperator(
+            task_id=sql_file.stem,
+            sql_path=str(sql_file),
+            db_path=str(tmp_path / "test.duckdb"),
+            profiling="json",
+            profile_dir=str(tmp_path / "profiles"),
+        )
+        operator.execute({"ti": ti})
+
+        if expect_profile:
+            ti.xcom_push.assert_called_once()
+            assert os.path.exists(ti.xcom_push.call_args.kwargs["value"])
+        else:
+            ti.xcom_push.assert_not_called()
@@ -0,0 +1,52 @@
+import sys, os
+sys.path.insert(0, os.path.abspath("airflow/dags"))
+
+import numpy as np
+import pandas as pd
+from ETLUserMetrics.pr_utils.memory import compact_dataframe, map_categories, memory_footprint_mb
+from ETLUserMetrics.pr_utils.transformation import extract_email_domain
+
+
+def test_compact_dataframe_uses_categories_and_downcasts():
+    df = pd.DataFrame({
+        "id": np.arange(10000, dtype=np.int64),
+        "firstname": ["****"] * 10000,
+        "gender": ["male", "female"] * 5000,
+        "birthday": [f"1980-01-{i}" for i in range(10000)],
+        "address": [{"city": "Berlin"}] * 10000,
+    })
+    before = memory_footprint_mb(df)
+
+    compact_dataframe(df)
+
+    assert df["id"].dtype == np.int16
+    assert isinstance(df["firstname"].dtype, pd.CategoricalDtype)
+    assert isinstance(df["gender"].dtype, pd.CategoricalDtype)
+    assert not isinstance(df["birthday"].dtype, pd.CategoricalDtype)
+    assert df["address"].dtype == object
+    assert memory_footprint_mb(df) < before
+
+
+def test_map_categories_matches_apply():
+    emails = pd.Series(["****@Gmail.com", "****@web.de", None, "****@gmail.com", "broken"])
+
+    mapped = map_categories(emails, extract_email_domain)
+
+    assert isinstance(mapped.dtype, pd.CategoricalDtype)
+    assert mapped.astype(object).tolist() == emails.apply(extract_email_domain).tolist()
+
+
+def test_map_categories_handles_none_and_mixed_results():
+    values = pd.Series(["a", "bb", None, "ccc", "a"])
+
+    def rule(value):
+        if not isinstance(value, str):
+            return None
+        return len(value) if len(value) > 1 else "short"
+
+    mapped = map_categories(values, rule)
+
+    assert isinstance(mapped.dtype, pd.CategoricalDtype)
+    assert mapped.isna().tolist() == [False, False, True, False, False]
+    assert mapped.astype(object).tolist()[:2] == ["short", 2]
+    assert mapped.astype(object).tolist()[3:] == [3, "short"]
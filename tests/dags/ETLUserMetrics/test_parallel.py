@@ -0,0 +1,80 @@
+import sys, os
+sys.path.insert(0, os.path.abspath("airflow/dags"))
+
+import pandas as pd
+import pytest
+import multiprocessing
+
+from ETLUserMetrics.pr_utils import parallel
+from ETLUserMetrics.pr_utils.parallel import (
+    can_fork,
+    get_chunk_bounds,
+    map_dataframe,
+    map_records,
+    should_parallelize,
+)
+
+pytestmark = pytest.mark.skipif(not can_fork(), reason="process pool requires the fork start method")
+
+
+def test_chunk_bounds_cover_all_rows_in_order():
+    assert get_chunk_bounds(10, 3) == [(0, 3), (3, 6), (6, 10)]
+    assert get_chunk_bounds(2, 8) == [(0, 1), (1, 2)]
+
+
+def test_map_dataframe_matches_serial_result():
+    df = pd.DataFrame({"n": range(1000), "label": ["a", "b"] * 500})
+    double = lambda chunk: chunk.assign(n=chunk["n"] * 2)
+
+    parallel = map_dataframe(df, double, workers=3, min_rows=0)
+
+    pd.testing.assert_frame_equal(parallel, double(df.copy()))
+
+
+def test_map_records_keeps_order_and_falls_back_for_mixed_types():
+    records = list(range(100))
+    # Mixed int/str values cannot be stored in one Arrow column
+    to_frame = lambda chunk, start: pd.DataFrame({"value": [v if v % 2 else str(v) for v in chunk]})
+
+    result = map_records(records, to_frame, workers=4, min_rows=0)
+
+    assert result["value"].tolist() == [v if v % 2 else str(v) for v in records]
+
+
+def test_map_records_handles_types_that_differ_between_chunks():
+    records = list(range(100))
+    # Ints in the first half, strings in the second: each chunk alone converts cleanly
+    to_frame = lambda chunk, start: pd.DataFrame({"value": [v if v < 50 else str(v) for v in chunk]})
+
+    result = map_records(records, to_frame, workers=2, min_rows=0)
+
+    assert result["value"].tolist() == to_frame(records, 0)["value"].tolist()
+
+
+def test_map_records_keeps_nested_values_exact():
+    records = [{"address": {"zipcode": 12345}} if i % 2 else {"address": {"zipcode": "A1", "city": "X"}} for i in range(40)]
+    to_frame = lambda chunk, start: pd.DataFrame({"id": range(start, start + len(chunk)), "address": [r["address"] for r in chunk]})
+
+    result = map_records(records, to_frame, workers=4, min_rows=0)
+
+    pd.testing.assert_frame_equal(result, to_frame(records, 0))
+
+
+def test_full_shared_memory_falls_back_instead_of_crashing(monkeypatch):
+    df = pd.DataFrame({"n": range(1000)})
+    double = lambda chunk: chunk.assign(n=chunk["n"] * 2)
+    monkeypatch.setattr(parallel, "shm_free_bytes", lambda: 1024)
+
+    # The input does not fit: runs in-process
+    pd.testing.assert_frame_equal(map_dataframe(df, double, workers=2, min_rows=0), double(df.copy()))
+
+    # Chunk results do not fit: pickled back from the workers
+    to_frame = lambda chunk, start: pd.DataFrame({"n": chunk})
+    result = map_records(list(range(100000)), to_frame, workers=2, min_rows=0)
+    assert result["n"].tolist() == list(range(100000))
+
+
+def test_daemonic_process_runs_in_process(monkeypatch):
+    assert should_parallelize(1000, workers=4, min_rows=0)
+    monkeypatch.setattr(multiprocessing.current_process(), "daemon", True)
+    assert not should_parallelize(1000, workers=4, min_rows=0)
@@ -0,0 +1,75 @@
+import sys, os
+sys.path.insert(0, os.path.abspath("airflow/dags"))
+
+import duckdb
+import pytest
+from ETLUserMetrics.pr_utils.profiling import (
+    deferred_profiles,
+    execute_query,
+    flatten_operators,
+    slowest_operators,
+    slowest_statements,
+)
+
+
+def test_execute_query_records_profile():
+    with duckdb.connect() as con:
+        con.execute("CREATE TABLE t AS SELECT range AS i, range % 7 AS g FROM range(1000)")
+
+        result = execute_query(
+            con, "SELECT g, COUNT(*) AS n FROM t WHERE i > ? GROUP BY g", (10,),
+            sql_name="group_by.sql", enabled=True,
+        )
+        assert len(result) == 7
+
+        statements = slowest_statements(con)
+        assert statements["sql_name"].tolist() == ["group_by.sql"]
+        assert statements["runs"].iloc[0] == 1
+        assert statements["max_peak_memory_bytes"].iloc[0] > 0
+
+        operators = slowest_operators(con)
+        assert not operators.empty
+
+
+def test_flatten_operators_supports_legacy_profile_keys():
+    profile = {
+        "timing": 0.5,
+        "children": [
+            {"name": "PROJECTION", "timing": 0.1, "cardinality": 7, "children": [
+                {"name": "SEQ_SCAN", "timing": 0.3, "cardinality": 1000, "children": []}
+            ]}
+        ],
+    }
+
+    operators = flatten_operators(profile)
+
+    assert [op["operator"] for op in operators] == ["PROJECTION", "SEQ_SCAN"]
+    assert operators[1]["depth"] == 1
+    assert operators[1]["cardinality"] == 1000
+
+
+def test_profiles_recorded_in_a_transaction_survive_rollback():
+    with duckdb.connect() as con:
+        con.execute("CREATE TABLE t (i INTEGER)")
+
+        with deferred_profiles(con):
+            con.execute("BEGIN TRANSACTION")
+            execute_query(con, "INSERT INTO t SELECT range FROM range(10)", sql_name="insert.sql", enabled=True)
+            con.execute("ROLLBACK")
+
+        assert con.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+        assert slowest_statements(con)["sql_name"].tolist() == ["insert.sql"]
+
+
+def test_failing_statement_in_transaction_surfaces_its_own_error():
+    with duckdb.connect() as con:
+        con.execute("CREATE TABLE t (i INTEGER PRIMARY KEY)")
+        con.execute("INSERT INTO t VALUES (1)")
+
+        with pytest.raises(duckdb.ConstraintException):
+            with deferred_profiles(con):
+                con.execute("BEGIN TRANSACTION")
+                execute_query(con, "INSERT INTO t VALUES (1)", sql_name="duplicate.sql", enabled=True)
+
+        # Profiling is off again and the connection is usable after the rollback
+        assert con.execute("SELECT 42").fetchone()[0] == 42
@@ -0,0 +1,113 @@
+import sys, os
+sys.path.insert(0, os.path.abspath("airflow/dags"))
+
+import duckdb
+import pytest
+from ETLUserMetrics.pr_utils.quality import (
+    DataQualityError,
+    compile_quality_query,
+    enforce_quality,
+    get_blocking_failures,
+    record_quality_results,
+    run_quality_checks,
+)
+
+CHECKS = [
+    {"type": "row_count", "min_rows": 1, "severity": "error"},
+    {"type": "row_count_delta", "max_change": 0.5, "severity": "error"},
+    {"type": "null_rate", "column": "email", "max_rate": 0.0, "severity": "error"},
+    {"type": "allowed_values", "column": "gender", "values": ["male", "female"], "max_rate": 0.0, "severity": "error"},
+    {"type": "pattern", "column": "email", "pattern": r"^[a-z]+\.[a-z]+$", "max_rate": 0.0, "severity": "error"},
+    {"type": "uniqueness", "columns": ["email", "gender"], "min_ratio": 0.9, "severity": "warn"},
+]
+
+
+@pytest.fixture
+def con():
+    with duckdb.connect() as con:
+        con.execute("CREATE TABLE persons_anonymized (email VARCHAR, gender VARCHAR, ingestion_date DATE)")
+        con.execute("""
+            INSERT INTO persons_anonymized VALUES
+                ('gmail.com', 'male', '2024-01-01'), ('web.de', 'female', '2024-01-01'),
+                ('gmail.com', 'male', '2024-01-02'), ('web.de', 'female', '2024-01-02')
+        """)
+        # Earlier loads leave their row counts behind as row_count_delta baselines
+        record_quality_results(con, run_quality_checks(con, "2024-01-01", checks=CHECKS, sample_percent=100))
+        yield con
+
+
+def test_quality_checks_pass_for_valid_partition(con):
+    results = run_quality_checks(con, "2024-01-02", checks=CHECKS, sample_percent=100)
+
+    assert results["passed"].all()
+    assert results.loc[results["check_name"] == "row_count_delta", "metric"].iloc[0] == 0.0
+    enforce_quality(results)
+
+
+def test_quality_checks_block_invalid_partition(con):
+    con.execute("""
+        INSERT INTO persons_anonymized VALUES
+            (NULL, 'other', '2024-01-03'), ('gmail.com', 'male', '2024-01-03'),
+            ('gmail.com', 'male', '2024-01-03'), ('gmail.com', 'male', '2024-01-03')
+    """)
+
+    results = run_quality_checks(con, "2024-01-03", checks=CHECKS, sample_percent=100)
+
+    assert get_blocking_failures(results) == [
+        "row_count_delta", "null_rate:email", "allowed_values:gender",
+    ]
+    with pytest.raises(DataQualityError):
+        enforce_quality(results)
+
+
+def test_sampling_only_applies_to_rate_checks():
+    sql, _ = compile_quality_query(CHECKS, "2024-01-02", sample_percent=10)
+
+    assert sql.count("USING SAMPLE") == 1
+    assert "CROSS JOIN" in sql
+
+
+def test_empty_sample_falls_back_to_full_partition(con):
+    # Two rows at 0.0001% leave the Bernoulli sample (almost surely) empty
+    results = run_quality_checks(con, "2024-01-02", checks=CHECKS, sample_percent=0.0001)
+
+    assert results["passed"].all()
+    assert (results["sample_percent"] == 100.0).all()
+
+
+def test_blocked_load_raises_quality_error_in_approx_mode(tmp_path, monkeypatch):
+    import pandas as pd
+    from ETLUserMetrics.pr_utils import transformation
+    from ETLUserMetrics.pr_utils.storage import load_init_internal_tables_sql
+
+    db_path = str(tmp_path / "pipeline.duckdb")
+    monkeypatch.setattr(transformation, "DUCKDB_PATH", db_path)
+    with duckdb.connect(db_path) as con:
+        con.execute(load_init_internal_tables_sql())
+
+    df = pd.DataFrame({
+        "faker_id": [1, 2], "email": ["gmail.com", "web.de"], "age_group": ["[20-30]", "[30-40]"],
+        "gender": ["male", "other"], "city": ["Berlin", "Paris"], "country": ["Germany", "France"],
+        "country_code": ["DE", "FR"], "ingestion_date": ["2024-01-01", "2024-01-01"],
+    })
+
+    with pytest.raises(DataQualityError, match="allowed_values:gender"):
+        transformation.insert_transformed_data(df, "2024-01-01", distinct_count_mode="approx", use_cache=False)
+
+    with duckdb.connect(db_path) as con:
+        assert con.execute("SELECT COUNT(*) FROM persons_anonymized").fetchone()[0] == 0
+
+
+def test_row_count_delta_baseline_survives_table_rebuild(con):
+    # The init task drops persons_anonymized before every load
+    con.execute("DROP TABLE persons_anonymized")
+    con.execute("""
+        CREATE TABLE persons_anonymized AS
+        SELECT 'gmail.com' AS email, 'male' AS gender, DATE '2024-01-02' AS ingestion_date FROM range(10)
+    """)
+
+    results = run_quality_checks(con, "2024-01-02", checks=CHECKS, sample_percent=100)
+
+    delta = results[results["check_name"] == "row_count_delta"].iloc[0]
+    assert delta["metric"] == 4.0  # 10 rows vs. the 2 recorded for 2024-01-01
+    assert not delta["passed"]
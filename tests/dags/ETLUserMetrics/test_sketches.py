@@ -0,0 +1,61 @@
+import sys, os
+sys.path.insert(0, os.path.abspath("airflow/dags"))
+
+import duckdb
+import pytest
+from ETLUserMetrics.pr_utils.sketches import (
+    approx_distinct_count,
+    exact_distinct_count,
+    get_precision,
+    refresh_sketches,
+)
+
+COLUMN_SETS = {"email_country": ["email", "country"]}
+
+
+@pytest.fixture
+def con():
+    with duckdb.connect() as con:
+        # 3 days with overlapping emails: 20k distinct (email, country) pairs overall
+        con.execute("""
+            CREATE TABLE persons_anonymized AS
+            SELECT
+                ((range * 7) % 20000)::VARCHAR AS email,
+                'Germany' AS country,
+                DATE '2024-01-01' + (range % 3)::INTEGER AS ingestion_date
+            FROM range(60000)
+        """)
+        for day in ("2024-01-01", "2024-01-02", "2024-01-03"):
+            refresh_sketches(con, day, column_sets=COLUMN_SETS, error_bound=0.01)
+        yield con
+
+
+def test_precision_matches_error_bound():
+    assert get_precision(0.01) == 14
+    assert get_precision(0.05) == 9
+
+
+def test_merged_sketches_stay_within_error_bound(con):
+    exact = exact_distinct_count(con, COLUMN_SETS["email_country"])
+    approx = approx_distinct_count(con, "email_country")
+
+    assert exact == 20000
+    assert abs(approx - exact) / exact < 0.03
+
+
+def test_sketches_merge_for_date_range(con):
+    exact = exact_distinct_count(con, COLUMN_SETS["email_country"], "2024-01-02", "2024-01-03")
+    approx = approx_distinct_count(con, "email_country", "2024-01-02", "2024-01-03")
+
+    assert abs(approx - exact) / exact < 0.03
+    assert approx_distinct_count(con, "email_country", "2025-01-01") == 0
+
+
+def test_sketches_survive_internal_table_init(con):
+    from ETLUserMetrics.pr_utils.storage import load_init_internal_tables_sql
+
+    before = approx_distinct_count(con, "email_country")
+    con.execute(load_init_internal_tables_sql())
+
+    assert con.execute("SELECT COUNT(*) FROM persons_anonymized").fetchone()[0] == 0
+    assert approx_distinct_count(con, "email_country") == before